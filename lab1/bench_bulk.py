@@ -0,0 +1,65 @@
+# bench_bulk.py
+"""
+Комментариев в секунду: POST /comments по одному против POST /comments/bulk.
+
+Запросы идут через ASGI-приложение (TestClient, без сети), поэтому видна
+именно стоимость обработки запроса, а не сети. Для bulk замеряются
+JSON-массив и NDJSON с разным размером пакета.
+
+Запуск из каталога lab1:
+    python bench_bulk.py --comments 20000 --batch-sizes 100 1000 10000
+    COMMENTS_BACKEND=sqlite COMMENTS_DB_PATH=/tmp/bench.db python bench_bulk.py
+"""
+import argparse
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def comments(count: int) -> list:
+    return [{"username": f"user{n % 100}", "text": f"Комментарий номер {n}"} for n in range(count)]
+
+
+def single(client: TestClient, items: list) -> float:
+    started = time.perf_counter()
+    for item in items:
+        assert client.post("/comments", json=item).status_code == 200
+    return len(items) / (time.perf_counter() - started)
+
+
+def bulk(client: TestClient, items: list, batch_size: int, ndjson: bool) -> float:
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    if ndjson:
+        bodies = ["\n".join(json.dumps(item, ensure_ascii=False) for item in batch).encode() for batch in batches]
+        content_type = "application/x-ndjson"
+    else:
+        bodies = [json.dumps(batch, ensure_ascii=False).encode() for batch in batches]
+        content_type = "application/json"
+    started = time.perf_counter()
+    for body in bodies:
+        response = client.post("/comments/bulk", content=body, headers={"content-type": content_type})
+        assert response.status_code == 200 and not response.json()["errors"], response.text
+    return len(items) / (time.perf_counter() - started)
+
+
+def main_bench() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comments", type=int, default=20_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    args = parser.parse_args()
+
+    client = TestClient(main.app)
+    items = comments(args.comments)
+    print(f"backend {main.COMMENTS_BACKEND}, {args.comments} comments")
+    print(f"  single            : {single(client, items[:max(1, args.comments // 10)]):10.0f} comments/s")
+    for batch_size in args.batch_sizes:
+        for ndjson in (False, True):
+            rate = bulk(client, items, batch_size, ndjson)
+            print(f"  bulk {'ndjson' if ndjson else 'json  '} x{batch_size:<6}: {rate:10.0f} comments/s")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,132 @@
+# bench_workers.py
+"""
+Масштабирование lab1 (лента комментариев) на несколько воркеров uvicorn.
+
+Для каждого бэкенда COMMENTS_BACKEND (memory, sqlite) и числа воркеров
+поднимается `uvicorn main:app --workers N`, затем --clients процессов-клиентов
+в течение --seconds шлют POST /comments по keep-alive соединениям (первые
+--warmup секунд не учитываются). После прогона проверяется согласованность:
+несколько новых соединений (попадающих на разные воркеры) читают всю ленту
+страницами GET /comments?after=<seq>&limit=1000 и сравнивают число
+комментариев с числом успешных POST. У memory каждый воркер хранит свою
+ленту - это и видно в проверке.
+
+Запуск из каталога lab1:
+    python bench_workers.py --workers 1 2 4 8 --clients 16 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, **env}
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def request(conn: http.client.HTTPConnection, method: str, url: str, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, url, body=json.dumps(body) if body is not None else None, headers=headers)
+    if hasattr(socket, "TCP_QUICKACK"):
+        # С --workers > 1 uvicorn не включает TCP_NODELAY на принятых соединениях:
+        # без немедленного ACK каждый ответ ждал бы ~40 мс (Nagle + delayed ACK)
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def client(port: int, warmup: float, seconds: float, seed: int, results) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    done = posted = 0
+    measure_from = time.monotonic() + warmup  # пока воркеры прогреваются, запросы не считаем
+    deadline = measure_from + seconds
+    while (now := time.monotonic()) < deadline:
+        status, _ = request(conn, "POST", "/comments", {"username": f"client{seed}", "text": f"comment {posted}"})
+        posted += status == 200
+        done += now >= measure_from
+    conn.close()
+    results.put((done, posted))
+
+
+def consistency(port: int, posted: int, probes: int = 16) -> dict:
+    """Что видят разные соединения после прогона"""
+    counts = set()
+    for _ in range(probes):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        seen, after = 0, 0
+        while True:
+            _, body = request(conn, "GET", f"/comments?after={after}&limit=1000")
+            page = json.loads(body)
+            if not page:
+                break
+            seen += len(page)
+            after = page[-1]["seq"]
+        conn.close()
+        counts.add(seen)
+    return {"posted": posted, "views": sorted(counts), "consistent": counts == {posted}}
+
+
+def run(backend: str, workers: int, clients: int, warmup: float, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(port, workers, {"COMMENTS_BACKEND": backend,
+                                              "COMMENTS_DB_PATH": os.path.join(tmp, "comments.db"),
+                                              "COMMENTS_RETENTION": "0"})
+        try:
+            results = multiprocessing.Queue()
+            pool = [multiprocessing.Process(target=client, args=(port, warmup, seconds, seed, results))
+                    for seed in range(clients)]
+            for p in pool:
+                p.start()
+            counts = [results.get() for _ in pool]
+            for p in pool:
+                p.join()
+            total = sum(done for done, _ in counts)
+            return {"rps": round(total / seconds), **consistency(port, sum(posted for _, posted in counts))}
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"cpu cores: {os.cpu_count()}")
+    for backend in args.backends:
+        for workers in sorted(set(args.workers)):
+            print(f"{backend:6} workers={workers:2}: {run(backend, workers, args.clients, args.warmup, args.seconds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# comments_store.py
+"""
+Хранилища комментариев - журнал только на добавление.
+
+Каждый комментарий получает порядковый номер seq (1, 2, 3, ...), по нему
+клиенты листают журнал курсором: "дай до limit комментариев после seq".
+Журнал режется на сегменты по segment_size записей; если задан retention,
+старые сегменты целиком удаляются, как только без них остается не меньше
+retention комментариев. Номера при этом не сдвигаются.
+"""
+import sqlite3
+import threading
+from typing import List
+
+
+class MemoryCommentStore:
+    """Журнал в памяти процесса: быстро, но каждый воркер видит только свои комментарии"""
+
+    def __init__(self, retention: int = 0, segment_size: int = 1024):
+        self.retention = retention
+        self.segment_size = segment_size
+        self._segments: List[List[dict]] = []
+        self._first_seq = 1  # номер первой записи первого сегмента
+        self._last_seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, comment: dict) -> int:
+        """Добавляет комментарий и возвращает его номер"""
+        return self.append_many([comment])[0]
+
+    def append_many(self, comments: List[dict]) -> range:
+        """Добавляет пакет одним блоком - номера идут подряд; возвращает их диапазон"""
+        with self._lock:
+            first_seq = self._last_seq + 1
+            for comment in comments:
+                if not self._segments or len(self._segments[-1]) == self.segment_size:
+                    self._segments.append([])
+                self._last_seq += 1
+                self._segments[-1].append({"seq": self._last_seq, **comment})
+            self._prune()
+            return range(first_seq, self._last_seq + 1)
+
+    def read(self, after: int = 0, limit: int = 100) -> List[dict]:
+        """До limit комментариев с номером больше after, по возрастанию номера"""
+        with self._lock:
+            index = max(after + 1, self._first_seq) - self._first_seq
+            segment, offset = divmod(index, self.segment_size)
+            items: List[dict] = []
+            while len(items) < limit and segment < len(self._segments):
+                items += self._segments[segment][offset:offset + limit - len(items)]
+                segment, offset = segment + 1, 0
+            return items
+
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def _prune(self) -> None:
+        while self.retention and len(self._segments) > 1 \
+                and self._last_seq - self._first_seq + 1 - len(self._segments[0]) >= self.retention:
+            del self._segments[0]
+            self._first_seq += self.segment_size
+
+
+class SqliteCommentStore:
+    """
+    Журнал во встроенной SQLite - один файл на все воркеры.
+
+    Добавление - одна INSERT-транзакция: номер выдает AUTOINCREMENT,
+    поэтому он уникален и растет даже при одновременной записи из разных процессов.
+    Старые сегменты удаляются одним DELETE, когда заполняется очередной сегмент.
+    """
+
+    def __init__(self, path: str, retention: int = 0, segment_size: int = 1024):
+        self.path = path
+        self.retention = retention
+        self.segment_size = segment_size
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS comments (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    text TEXT NOT NULL
+                )
+                """
+            )
+
+    def append(self, comment: dict) -> int:
+        with self._connection() as conn:
+            seq = conn.execute(
+                "INSERT INTO comments (username, text) VALUES (?, ?)", (comment["username"], comment["text"])
+            ).lastrowid
+            if seq % self.segment_size == 0:
+                self._prune(conn, seq)
+            return seq
+
+    def append_many(self, comments: List[dict]) -> range:
+        """Пакет одной транзакцией; BEGIN IMMEDIATE не пускает других писателей, поэтому номера идут подряд"""
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'comments'").fetchone()
+            first_seq = (row[0] if row is not None else 0) + 1
+            conn.executemany(
+                "INSERT INTO comments (username, text) VALUES (?, ?)",
+                [(comment["username"], comment["text"]) for comment in comments]
+            )
+            last_seq = first_seq + len(comments) - 1
+            if (first_seq - 1) // self.segment_size != last_seq // self.segment_size:
+                self._prune(conn, last_seq)
+        return range(first_seq, last_seq + 1)
+
+    def read(self, after: int = 0, limit: int = 100) -> List[dict]:
+        rows = self._connection().execute(
+            "SELECT seq, username, text FROM comments WHERE seq > ? ORDER BY seq LIMIT ?", (after, limit)
+        )
+        return [{"seq": seq, "username": username, "text": text} for seq, username, text in rows]
+
+    def last_seq(self) -> int:
+        row = self._connection().execute("SELECT seq FROM sqlite_sequence WHERE name = 'comments'").fetchone()
+        return row[0] if row is not None else 0
+
+    def _prune(self, conn: sqlite3.Connection, seq: int) -> None:
+        if self.retention:
+            cutoff = (seq - self.retention) // self.segment_size * self.segment_size
+            conn.execute("DELETE FROM comments WHERE seq <= ?", (cutoff,))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def open_store(backend: str = "memory", path: str = "comments.db", retention: int = 0, segment_size: int = 1024):
+    """Хранилище по имени бэкенда: memory - в памяти процесса, sqlite - общее для воркеров"""
+    if backend == "memory":
+        return MemoryCommentStore(retention, segment_size)
+    if backend == "sqlite":
+        return SqliteCommentStore(path, retention, segment_size)
+    raise ValueError(f"unknown comments backend: {backend}")
@@ -1,6 +1,29 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import List
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import Dict, List, Optional, Tuple
+
+from comments_store import open_store
+
+# memory - список в памяти процесса (один воркер); sqlite - общий файл для всех воркеров
+COMMENTS_BACKEND = os.getenv("COMMENTS_BACKEND", "memory")
+COMMENTS_DB_PATH = os.getenv("COMMENTS_DB_PATH", "comments.db")
+# Сколько последних комментариев хранить (0 - без ограничения); удаляются целыми сегментами
+COMMENTS_RETENTION = int(os.getenv("COMMENTS_RETENTION", "100000"))
+COMMENTS_SEGMENT_SIZE = int(os.getenv("COMMENTS_SEGMENT_SIZE", "1024"))
+# Как часто long-poll проверяет появление новых комментариев (в том числе
+# от других воркеров), секунды; добавления в этом процессе будят сразу
+COMMENTS_POLL_INTERVAL = float(os.getenv("COMMENTS_POLL_INTERVAL", "0.1"))
+STREAM_PAGE_SIZE = 1000
+# Максимум комментариев в одном POST /comments/bulk
+COMMENTS_BULK_MAX_ITEMS = int(os.getenv("COMMENTS_BULK_MAX_ITEMS", "10000"))
+# Максимальный размер тела POST /comments/bulk, байты
+COMMENTS_BULK_MAX_BYTES = int(os.getenv("COMMENTS_BULK_MAX_BYTES", str(16 * 2 ** 20)))
 
 # экземпляр приложения
 app = FastAPI()
@@ -10,9 +33,186 @@ class Comments(BaseModel):
     username: str
     text: str
 
-#список в памяти
+class CommentOut(Comments):
+    seq: int
+
+class BulkItemError(BaseModel):
+    index: int
+    errors: List[dict]
+
+class BulkResult(BaseModel):
+    accepted: int
+    first_seq: int
+    last_seq: int
+    errors: List[BulkItemError]
+
+comments_adapter = TypeAdapter(List[Comments])
+comment_adapter = TypeAdapter(Comments)
+
+#хранилище комментариев
+
+comments_db = open_store(COMMENTS_BACKEND, COMMENTS_DB_PATH, COMMENTS_RETENTION, COMMENTS_SEGMENT_SIZE)
+
+
+class CommentsWatcher:
+    """
+    Общее ожидание новых комментариев для long-poll.
+
+    Пока есть ожидающие, одна задача на процесс читает last_seq хранилища
+    (в пуле потоков - для sqlite это запрос к БД) раз в interval секунд
+    и будит всех ожидающих разом. notify() после добавления в этом
+    процессе запускает проверку сразу, не дожидаясь интервала.
+    """
+
+    def __init__(self, store, interval: float):
+        self.store = store
+        self.interval = interval
+        self.last_seq = 0
+        self._waiters = 0
+        self._task = None
+        self._loop = None
+        self._changed = None
+        self._kick = None
+
+    async def wait(self, since: int, timeout: float) -> None:
+        """Ждет, пока не появится комментарий новее since, но не дольше timeout"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._changed, self._kick = loop, asyncio.Event(), asyncio.Event()
+        deadline = loop.time() + timeout
+        self._waiters += 1
+        try:
+            if self._task is None:
+                self._task = asyncio.ensure_future(self._poll())
+            while self.last_seq <= since:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    return
+        finally:
+            self._waiters -= 1
+
+    def notify(self) -> None:
+        """Вызывается после добавления комментариев; можно из любого потока"""
+        loop = self._loop
+        if loop is not None and self._waiters and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        self._kick.set()
+
+    async def _poll(self) -> None:
+        try:
+            while self._waiters:
+                self._kick.clear()
+                seq = await run_in_threadpool(self.store.last_seq)
+                if seq != self.last_seq:
+                    self.last_seq = seq
+                    self._changed.set()
+                    self._changed = asyncio.Event()
+                try:
+                    await asyncio.wait_for(self._kick.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._task = None
+
+
+comments_watcher = CommentsWatcher(comments_db, COMMENTS_POLL_INTERVAL)
+
 
-comments_db = []
+def comments_response(items: List[dict], after: int) -> Response:
+    """JSON-ответ без повторной валидации; X-Next-Cursor - курсор для следующей страницы"""
+    next_cursor = items[-1]["seq"] if items else after
+    return Response(
+        content=json.dumps(items, ensure_ascii=False),
+        media_type="application/json",
+        headers={"X-Next-Cursor": str(next_cursor)}
+    )
+
+def too_many_comments() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Не больше {COMMENTS_BULK_MAX_ITEMS} комментариев за запрос")
+
+
+async def read_bulk(request: Request, ndjson: bool) -> Tuple[bytes, List[bytes]]:
+    """
+    Читает тело пакета, не выходя за лимиты: размер проверяется по Content-Length
+    до чтения и по прочитанным байтам по ходу чтения, а непустые строки NDJSON
+    считаются по мере прихода - лишнее не читается и не разбирается.
+    Возвращает тело и (для NDJSON) его непустые строки.
+    """
+    length = request.headers.get("content-length", "")
+    too_big = HTTPException(status_code=413, detail=f"Тело запроса больше {COMMENTS_BULK_MAX_BYTES} байт")
+    if length.isdigit() and int(length) > COMMENTS_BULK_MAX_BYTES:
+        raise too_big
+    body = bytearray()
+    lines: List[bytes] = []
+    scanned = 0  # до этого места тело уже разбито на строки
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > COMMENTS_BULK_MAX_BYTES:
+            raise too_big
+        end = body.rfind(b"\n", scanned) + 1 if ndjson else 0
+        if end > scanned:
+            lines += [line for line in bytes(body[scanned:end]).split(b"\n") if line.strip()]
+            scanned = end
+            if len(lines) > COMMENTS_BULK_MAX_ITEMS:
+                raise too_many_comments()
+    if ndjson and body[scanned:].strip():
+        lines.append(bytes(body[scanned:]))
+        if len(lines) > COMMENTS_BULK_MAX_ITEMS:
+            raise too_many_comments()
+    return bytes(body), lines
+
+
+def validate_bulk(body: bytes, lines: Optional[List[bytes]]) -> Tuple[List[dict], List[BulkItemError]]:
+    """
+    Проверяет весь пакет сразу: JSON-массив - одним вызовом TypeAdapter,
+    NDJSON - каждую строку как один комментарий (склейка строк в массив
+    приняла бы строку "{...},{...}" за два). Если в пакете есть ошибки,
+    разбирает его по элементам: возвращает валидные комментарии и позиции
+    (с 0, для NDJSON - среди непустых строк) невалидных.
+    lines - непустые строки NDJSON (см. read_bulk) или None для JSON-массива.
+    """
+    errors: Dict[int, List[dict]] = {}
+    if lines is not None:
+        try:
+            return [comment_adapter.validate_json(line).model_dump() for line in lines], []
+        except ValidationError:
+            pass
+        items = []
+        for index, line in enumerate(lines):
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+                errors[index] = [{"loc": [], "msg": "Invalid JSON", "type": "json_invalid"}]
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Тело запроса не является корректным JSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Ожидается JSON-массив комментариев")
+        # Разбор ограничен размером тела; число элементов проверяется до валидации
+        if len(items) > COMMENTS_BULK_MAX_ITEMS:
+            raise too_many_comments()
+        try:
+            return [comment.model_dump() for comment in comments_adapter.validate_python(items)], []
+        except ValidationError:
+            pass
+
+    positions = [index for index in range(len(items)) if index not in errors]
+    try:
+        comments_adapter.validate_python([items[index] for index in positions])
+    except ValidationError as e:
+        for error in e.errors(include_url=False, include_input=False):
+            index = positions[error["loc"][0]]
+            errors.setdefault(index, []).append({"loc": list(error["loc"][1:]), "msg": error["msg"],
+                                                 "type": error["type"]})
+    valid = comments_adapter.validate_python([items[index] for index in positions if index not in errors])
+    return [comment.model_dump() for comment in valid], \
+        [BulkItemError(index=index, errors=errors[index]) for index in sorted(errors)]
 
 # маршрут для публикации нового комментария
 @app.post("/comments")
@@ -21,12 +221,80 @@ def create_comment(comment: Comments):
     Принимает новый комментарий и добавляет его в нашу "базу данных".
     """
     comments_db.append(comment.model_dump())
+    comments_watcher.notify()
     return {"message": "Comment added successfully"}
 
-#маршрут для получения всех комментариев
-@app.get("/comments", response_model=List[Comments])
-def get_comments():
+#маршрут для пакетной загрузки комментариев
+@app.post("/comments/bulk", response_model=BulkResult)
+async def create_comments_bulk(request: Request):
+    """
+    Принимает JSON-массив комментариев или NDJSON (Content-Type: application/x-ndjson).
+    Валидные комментарии добавляются одним блоком с номерами подряд,
+    для невалидных возвращаются их позиции и ошибки - остальной пакет не отклоняется.
+    Пакет больше COMMENTS_BULK_MAX_BYTES байт или COMMENTS_BULK_MAX_ITEMS
+    комментариев отклоняется (413) до валидации.
+    """
+    ndjson = request.headers.get("content-type", "").startswith(("application/x-ndjson", "application/jsonl"))
+    body, lines = await read_bulk(request, ndjson)
+    comments, errors = await run_in_threadpool(validate_bulk, body, lines if ndjson else None)
+    seqs = await run_in_threadpool(comments_db.append_many, comments) if comments else range(0)
+    comments_watcher.notify()
+    return BulkResult(
+        accepted=len(comments),
+        first_seq=seqs.start if seqs else 0,
+        last_seq=seqs[-1] if seqs else 0,
+        errors=errors
+    )
+
+#маршрут для получения комментариев постранично
+@app.get("/comments", response_model=List[CommentOut])
+def get_comments(
+        after: int = Query(0, ge=0, description="Вернуть комментарии с номером больше этого"),
+        limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Возвращает до limit комментариев после курсора after.
+    Номер последнего из них приходит в заголовке X-Next-Cursor.
+    """
+    return comments_response(comments_db.read(after, limit), after)
+
+#маршрут для выгрузки всех комментариев потоком NDJSON
+@app.get("/comments/stream")
+def stream_comments(after: int = Query(0, ge=0)):
+    """
+    Отдает все комментарии после after по одному на строку, читая журнал страницами.
+    Комментарии, добавленные после начала выгрузки, в нее не попадают.
+    """
+    last_seq = comments_db.last_seq()
+
+    def lines():
+        cursor = after
+        while cursor < last_seq:
+            page = comments_db.read(cursor, STREAM_PAGE_SIZE)
+            if not page:
+                return
+            for item in page:
+                if item["seq"] > last_seq:
+                    return
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+            cursor = page[-1]["seq"]
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+#маршрут long-poll: ждет новые комментарии
+@app.get("/comments/updates", response_model=List[CommentOut])
+async def comment_updates(
+        since: int = Query(..., ge=0, description="Последний уже полученный номер"),
+        limit: int = Query(100, ge=1, le=1000),
+        timeout: float = Query(25, ge=0, le=60, description="Сколько ждать, секунды")
+):
     """
-    Возвращает список всех ранее добавленных комментариев.
+    Сразу возвращает комментарии новее since, если они есть; иначе ждет их
+    до timeout секунд и возвращает пустой список, если так ничего и не пришло.
     """
-    return comments_db
\ No newline at end of file
+    items = await run_in_threadpool(comments_db.read, since, limit)
+    if not items and timeout > 0:
+        await comments_watcher.wait(since, timeout)
+        if comments_watcher.last_seq > since:
+            items = await run_in_threadpool(comments_db.read, since, limit)
+    return comments_response(items, since)
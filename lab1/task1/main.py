@@ -1,10 +1,23 @@
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+
+from static_assets import StaticAssets
+
+# Страница читается с диска один раз при старте: ETag и сжатые варианты считаются заранее
+pages = StaticAssets(directory=".", prefix="")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pages.load(["lab1.html"])
+    yield
+
 
 # экземпляр приложения
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Создание endpoint для GET-запроса к корневому URL
 @app.get("/")
-def read_root():
-    return FileResponse("lab1.html")
\ No newline at end of file
+def read_root(request: Request):
+    return pages.response("lab1.html", request)
@@ -0,0 +1,127 @@
+# Копия lab6/static_assets.py: каждая лаба запускается из своего каталога с плоскими
+# импортами и общего пакета нет. Изменения вносить в обе копии.
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Iterable, Optional
+
+from fastapi import HTTPException, Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli не установлен - отдаем только gzip
+    brotli = None
+
+# Файлы с хэшем в имени никогда не меняются - их можно кэшировать "навсегда"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Файлы без хэша браузер должен перепроверять (ответ 304 по ETag)
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Сжатие маленьких файлов не окупается
+MIN_COMPRESS_SIZE = 256
+
+
+class Asset:
+    """Статический файл в памяти: исходное содержимое, сжатые варианты и ETag каждого из них"""
+
+    def __init__(self, name: str, content: bytes):
+        self.name = name
+        self.digest = hashlib.sha256(content).hexdigest()[:16]
+        self.media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        root, ext = os.path.splitext(name)
+        self.hashed_name = f"{root}.{self.digest}{ext}"
+
+        # кодировка -> (тело, ETag)
+        self.variants: Dict[str, tuple] = {"identity": (content, f'"{self.digest}"')}
+        if len(content) >= MIN_COMPRESS_SIZE:
+            gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(gzipped) < len(content):
+                self.variants["gzip"] = (gzipped, f'"{self.digest}-gz"')
+            if brotli is not None:
+                compressed = brotli.compress(content, quality=11)
+                if len(compressed) < len(content):
+                    self.variants["br"] = (compressed, f'"{self.digest}-br"')
+
+
+def accepted_encodings(header: str) -> set:
+    """Кодировки из Accept-Encoding, которые клиент готов принять (q > 0)"""
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        key, _, value = params.partition("=")
+        if key.strip() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class StaticAssets:
+    """
+    Индекс статических файлов, построенный при старте приложения.
+
+    Для каждого файла заранее считаются хэш содержимого и сжатые варианты
+    (gzip, brotli), поэтому запросы, в том числе условные (If-None-Match),
+    обслуживаются из памяти без обращения к диску.
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static"):
+        self.directory = directory
+        self.prefix = prefix
+        self._assets: Dict[str, Asset] = {}
+        self._by_hashed_name: Dict[str, Asset] = {}
+
+    def load(self, names: Optional[Iterable[str]] = None) -> None:
+        """Читает файлы каталога (или только перечисленные) и строит индекс"""
+        if names is None:
+            names = [
+                os.path.relpath(os.path.join(root, file), self.directory).replace(os.sep, "/")
+                for root, _, files in os.walk(self.directory)
+                for file in files
+            ]
+        assets, by_hashed_name = {}, {}
+        for name in names:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                asset = Asset(name, f.read())
+            assets[name] = asset
+            by_hashed_name[asset.hashed_name] = asset
+        self._assets, self._by_hashed_name = assets, by_hashed_name
+
+    def url(self, name: str) -> str:
+        """URL файла с хэшем содержимого в имени (для шаблонов)"""
+        asset = self._assets.get(name)
+        if asset is None:
+            return f"{self.prefix}/{name}"
+        return f"{self.prefix}/{asset.hashed_name}"
+
+    def response(self, name: str, request: Request) -> Response:
+        """Ответ на запрос файла: выбор сжатого варианта, ETag, 304 и заголовки кэширования"""
+        asset = self._by_hashed_name.get(name)
+        if asset is not None:
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            asset = self._assets.get(name)
+            cache_control = REVALIDATE_CACHE_CONTROL
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in accepted and e in asset.variants), "identity")
+        body, etag = asset.variants[encoding]
+
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or etag in tags:
+                return Response(status_code=304, headers=headers)
+
+        return Response(content=body, media_type=asset.media_type, headers=headers)
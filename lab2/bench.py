@@ -0,0 +1,192 @@
+"""
+Бенчмарк поиска товаров на синтетических каталогах (в том числе с кириллицей).
+
+Для каждого размера каталога и типа запроса измеряются p50/p99 задержки,
+пропускная способность и пиковая память - при прямом вызове функций
+эндпоинтов и через ASGI-приложение (TestClient, без сети).
+Результаты сохраняются в JSON; если передан --baseline, они сравниваются
+с прошлым прогоном и регрессии выводятся отдельно.
+
+Запуск из каталога lab2:
+    python bench.py --sizes 1000 100000 1000000 --output bench_results.json
+    python bench.py --baseline bench_results.json
+
+По умолчанию кэш результатов поиска отключен, чтобы измерялся сам поиск;
+--with-cache оставляет его включенным.
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+import main
+from catalog import ProductCatalog
+from main import Product
+
+ADJECTIVES = ["Красный", "Большой", "Умный", "Беспроводной", "Portable", "Smart", "Classic", "Новый"]
+NOUNS = ["чайник", "стакан", "термокружка", "наушники", "phone", "laptop", "футболка", "лампа"]
+BRANDS = ["Орбита", "Zenit", "Вектор", "Nova", "Сокол", "Apex"]
+CATEGORIES = ["Electronics", "Home", "Clothing", "Дом", "Электроника"]
+
+
+def build_catalog(size: int, seed: int = 42) -> ProductCatalog:
+    """Синтетический каталог: у каждого товара уникальный артикул в названии"""
+    rnd = random.Random(seed)
+    catalog = ProductCatalog(product_type=Product)
+    for product_id in range(1, size + 1):
+        catalog.add(Product.model_construct(
+            product_id=product_id,
+            name=f"{rnd.choice(ADJECTIVES)} {rnd.choice(NOUNS)} {rnd.choice(BRANDS)} арт{product_id:07d}",
+            category=rnd.choice(CATEGORIES),
+            price=round(rnd.uniform(10, 100_000), 2)
+        ))
+    return catalog
+
+
+def query_shapes(size: int) -> dict:
+    """Типы запросов: параметры /products/search"""
+    return {
+        "selective_keyword": {"keyword": f"арт{size // 2:07d}"},
+        "broad_keyword": {"keyword": "чайник"},
+        "category_filter": {"keyword": "о", "category": "электроника"},
+        "limit_100": {"keyword": "smart", "limit": 100},
+    }
+
+
+def search_kwargs(params: dict) -> dict:
+    """Все аргументы search_products (при прямом вызове значения Query по умолчанию не подставляются)"""
+    return {
+        "keyword": params["keyword"],
+        "category": params.get("category"),
+        "min_price": None,
+        "max_price": None,
+        "sort": None,
+        "offset": 0,
+        "limit": params.get("limit", 10),
+    }
+
+
+def measure(call, iterations: int) -> dict:
+    """Задержки и пропускная способность, затем пиковая память отдельного прогона"""
+    call()  # прогрев
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 4),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 4),
+        "throughput_rps": round(iterations / elapsed, 1),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_size(size: int, iterations: int, client: TestClient) -> dict:
+    started = time.perf_counter()
+    main.products_db = build_catalog(size)
+    main.search_cache.clear()
+    build_seconds = time.perf_counter() - started
+    product_id = size // 2
+
+    results = {
+        "build_seconds": round(build_seconds, 2),
+        "max_rss_mb": None,
+        "queries": {},
+    }
+    shapes = {"get_product": None, **query_shapes(size)}
+    for shape, params in shapes.items():
+        if params is None:
+            direct = lambda: main.get_product(product_id=product_id)
+            url, query = f"/product/{product_id}", None
+        else:
+            kwargs = search_kwargs(params)
+            direct = lambda kwargs=kwargs: main.search_products(**kwargs)
+            url, query = "/products/search", params
+
+        def via_asgi(url=url, query=query):
+            response = client.get(url, params=query)
+            assert response.status_code == 200, response.text
+
+        results["queries"][shape] = {
+            "direct": measure(direct, iterations),
+            "asgi": measure(via_asgi, max(1, iterations // 5)),
+        }
+        print(f"  {shape:18} direct p50={results['queries'][shape]['direct']['p50_ms']:.3f} ms  "
+              f"asgi p50={results['queries'][shape]['asgi']['p50_ms']:.3f} ms")
+
+    results["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Запросы, у которых p50 вырос больше чем в (1 + threshold) раз"""
+    regressions = []
+    for size, size_results in current["sizes"].items():
+        base_size = baseline.get("sizes", {}).get(size)
+        if base_size is None:
+            continue
+        for shape, modes in size_results["queries"].items():
+            for mode, stats in modes.items():
+                base = base_size["queries"].get(shape, {}).get(mode)
+                if base and stats["p50_ms"] > base["p50_ms"] * (1 + threshold):
+                    regressions.append(
+                        f"{size} {shape} {mode}: p50 {base['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms"
+                    )
+    return regressions
+
+
+def run(args) -> None:
+    client = TestClient(main.app)
+    if not args.with_cache:
+        main.search_cache.max_size = 0
+    report = {
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "search_cache": args.with_cache,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        print(f"catalog size {size}:")
+        report["sizes"][str(size)] = run_size(size, args.iterations, client)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        print("regressions:" if regressions else "no regressions against baseline")
+        for line in regressions:
+            print(f"  {line}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"results saved to {args.output}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--with-cache", action="store_true", help="не отключать кэш результатов поиска")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый рост p50 (0.2 = 20%%)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run(parse_args())
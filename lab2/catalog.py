@@ -0,0 +1,241 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+
+# Длина n-грамм в индексе по названиям
+NGRAM = 3
+
+# Начальная емкость колонок (дальше удваивается)
+INITIAL_CAPACITY = 16
+
+# По сколько строк проверяется подстрока, пока не набрана нужная страница
+SCAN_CHUNK = 4096
+
+
+def ngrams(text: str, n: int = NGRAM) -> Set[str]:
+    """Множество подстрок длины n"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class ProductCatalog:
+    """
+    Каталог товаров, хранящийся по колонкам.
+
+    - product_id, цена и код категории - массивы NumPy, фильтрация по цене
+      и категории, сортировка и агрегаты считаются векторно;
+    - словарь product_id -> номер строки для поиска по ID за O(1);
+    - инвертированный индекс триграмм по названиям в нижнем регистре.
+
+    Поиск по ключевому слову проверяет только кандидатов из индекса триграмм,
+    а результат совпадает с проверкой `keyword.lower() in name.lower()`
+    в порядке добавления товаров. Объекты модели создаются только для
+    строк, попавших в ответ.
+
+    version увеличивается при каждом изменении каталога - по нему
+    кэши результатов поиска понимают, что их записи устарели.
+    """
+
+    def __init__(self, products: Iterable = (), product_type=None):
+        self.product_type = product_type
+        self.version = 0
+        self._size = 0
+        self._ids = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._prices = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self._category_codes = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self._alive = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._names: List[Optional[str]] = []
+        self._names_lower: List[Optional[str]] = []
+        self._categories: List[str] = []              # код -> название категории
+        self._category_codes_by_name: Dict[str, int] = {}
+        self._row_by_id: Dict[int, int] = {}
+        # Списки строк по триграмме растут только дописыванием, поэтому всегда отсортированы;
+        # удаленные строки в них остаются и отсекаются маской _alive
+        self._rows_by_ngram: Dict[str, List[int]] = {}
+        self._ngram_arrays: Dict[str, np.ndarray] = {}
+        for product in products:
+            if self.product_type is None:
+                self.product_type = type(product)
+            self.add(product)
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    def __iter__(self) -> Iterator:
+        return (self._product(row) for row in np.flatnonzero(self._alive[:self._size]))
+
+    def get(self, product_id: int):
+        """Товар по ID или None"""
+        row = self._row_by_id.get(product_id)
+        return self._product(row) if row is not None else None
+
+    def add(self, product) -> None:
+        """Добавляет товар (или заменяет товар с тем же product_id)"""
+        if product.product_id in self._row_by_id:
+            self.remove(product.product_id)
+        if self._size == len(self._ids):
+            self._grow()
+
+        row = self._size
+        self._size += 1
+        self.version += 1
+        name_lower = product.name.lower()
+        self._ids[row] = product.product_id
+        self._prices[row] = product.price
+        self._category_codes[row] = self._category_code(product.category)
+        self._alive[row] = True
+        self._names.append(product.name)
+        self._names_lower.append(name_lower)
+        self._row_by_id[product.product_id] = row
+        for gram in ngrams(name_lower):
+            self._rows_by_ngram.setdefault(gram, []).append(row)
+            self._ngram_arrays.pop(gram, None)
+
+    def remove(self, product_id: int) -> bool:
+        """Удаляет товар по ID; False, если такого нет"""
+        row = self._row_by_id.pop(product_id, None)
+        if row is None:
+            return False
+        self.version += 1
+        self._alive[row] = False
+        self._names[row] = None
+        self._names_lower[row] = None
+        return True
+
+    def search(
+            self,
+            keyword: str,
+            category: Optional[str] = None,
+            min_price: Optional[float] = None,
+            max_price: Optional[float] = None,
+            sort: Optional[str] = None,
+            offset: int = 0,
+            limit: Optional[int] = None
+    ) -> List:
+        """
+        Товары, в названии которых есть keyword (без учета регистра).
+        Фильтры по категории и диапазону цены, сортировка по цене
+        ("price_asc" / "price_desc") и страница offset/limit.
+        """
+        keyword_lower = keyword.lower()
+        candidates = self._candidates(keyword_lower)
+        rows = np.arange(self._size) if candidates is None else candidates
+
+        # Векторные фильтры по колонкам - до проверки подстроки
+        mask = self._alive[rows]
+        if category is not None:
+            mask &= np.isin(self._category_codes[rows], self._category_codes_matching(category))
+        if min_price is not None:
+            mask &= self._prices[rows] >= min_price
+        if max_price is not None:
+            mask &= self._prices[rows] <= max_price
+        rows = rows[mask]
+
+        end = None if limit is None else offset + limit
+        names_lower = self._names_lower
+        if sort is None:
+            # Без сортировки порядок - порядок добавления, можно остановиться на последней нужной строке
+            matched = []
+            for start in range(0, rows.size, SCAN_CHUNK):
+                for row in rows[start:start + SCAN_CHUNK].tolist():
+                    if keyword_lower in names_lower[row]:
+                        matched.append(row)
+                if end is not None and len(matched) >= end:
+                    break
+            page = matched[offset:end]
+        else:
+            if candidates is not None and len(keyword_lower) == NGRAM:
+                matched = rows  # все триграммы совпали - это и есть подстрока
+            else:
+                matched = rows[[keyword_lower in names_lower[row] for row in rows.tolist()]]
+            prices = self._prices[matched]
+            # Стабильная сортировка: при равной цене сохраняется порядок добавления
+            order = np.argsort(-prices if sort == "price_desc" else prices, kind="stable")
+            page = matched[order][offset:end].tolist()
+
+        return [self._product(row) for row in page]
+
+    def category_stats(self) -> List[dict]:
+        """Количество, минимальная, максимальная и средняя цена по каждой категории"""
+        alive = self._alive[:self._size]
+        codes = self._category_codes[:self._size][alive]
+        if codes.size == 0:
+            return []
+        prices = self._prices[:self._size][alive]
+
+        order = np.argsort(codes, kind="stable")
+        codes, prices = codes[order], prices[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        counts = np.diff(np.r_[starts, codes.size])
+        sums = np.add.reduceat(prices, starts)
+        mins = np.minimum.reduceat(prices, starts)
+        maxs = np.maximum.reduceat(prices, starts)
+
+        return [
+            {
+                "category": self._categories[code],
+                "count": count,
+                "min_price": min_price,
+                "max_price": max_price,
+                "mean_price": total / count,
+            }
+            for code, count, total, min_price, max_price in zip(
+                codes[starts].tolist(), counts.tolist(), sums.tolist(), mins.tolist(), maxs.tolist()
+            )
+        ]
+
+    def _product(self, row: int):
+        """Объект модели для строки (данные уже проверены при добавлении)"""
+        return self.product_type.model_construct(
+            product_id=int(self._ids[row]),
+            name=self._names[row],
+            category=self._categories[self._category_codes[row]],
+            price=float(self._prices[row])
+        )
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_codes_by_name.get(category)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(category)
+            self._category_codes_by_name[category] = code
+        return code
+
+    def _category_codes_matching(self, category: str) -> List[int]:
+        """Коды категорий, совпадающих с category без учета регистра"""
+        category_lower = category.lower()
+        return [code for code, name in enumerate(self._categories) if name.lower() == category_lower]
+
+    def _grow(self) -> None:
+        capacity = len(self._ids) * 2
+        for column in ("_ids", "_prices", "_category_codes", "_alive"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, column, new)
+
+    def _candidates(self, keyword_lower: str) -> Optional[np.ndarray]:
+        """
+        Отсортированный массив строк, содержащих все триграммы ключевого слова;
+        None - ключевое слово короче триграммы и индекс не применим
+        """
+        grams = ngrams(keyword_lower)
+        if not grams:
+            return None
+        postings = sorted((self._ngram_array(gram) for gram in grams), key=len)
+        rows = postings[0]
+        for posting in postings[1:]:
+            if rows.size == 0:
+                break
+            # Оба массива отсортированы: ищем строки меньшего в большем двоичным поиском
+            positions = np.searchsorted(posting, rows)
+            positions[positions == posting.size] = 0
+            rows = rows[posting[positions] == rows] if posting.size else posting
+        return rows
+
+    def _ngram_array(self, gram: str) -> np.ndarray:
+        """Список строк триграммы в виде массива NumPy (кэшируется до следующего добавления)"""
+        array = self._ngram_arrays.get(gram)
+        if array is None:
+            array = np.array(self._rows_by_ngram.get(gram, ()), dtype=np.int64)
+            self._ngram_arrays[gram] = array
+        return array
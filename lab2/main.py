@@ -1,7 +1,11 @@
-from typing import List, Optional
+import os
+from typing import List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException, Query, Path
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Path, Response
+from pydantic import BaseModel, TypeAdapter
+
+from catalog import ProductCatalog
+from search_cache import SearchCache
 
 app = FastAPI(title="Product API", version="1.0")
 
@@ -16,15 +20,32 @@ class Product(BaseModel):
 
 # ---------------------------------------------------------
 # 2) "База" из нескольких товаров для примера
+#    (колоночный каталог с индексами по ID и триграммам названий)
 # ---------------------------------------------------------
-products_db = [
+products_db = ProductCatalog(product_type=Product, products=[
     Product(product_id=1, name="iPhone",         category="Electronics", price=792349.0),
     Product(product_id=2, name="MacBook Pro",       category="Electronics", price=193399.0),
     Product(product_id=3, name="Стакан", category="Home",        price=1234.5),
     Product(product_id=4, name="Термокружка",        category="Home",        price=25.0),
     Product(product_id=5, name="Футболка", category="Clothing",   price=1125.0),
     Product(product_id=6, name="Беспроводные наушники", category="Electronics", price=123210.0),
-]
+])
+
+
+class CategoryStats(BaseModel):
+    category: str
+    count: int
+    min_price: float
+    max_price: float
+    mean_price: float
+
+# Кэш результатов поиска: записи устаревают сами при изменении каталога (по products_db.version).
+# При SEARCH_CACHE_JSON=1 хранится готовый JSON ответа, и попадание в кэш
+# обходится без валидации и сериализации Pydantic.
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_JSON = os.getenv("SEARCH_CACHE_JSON", "1") == "1"
+search_cache = SearchCache(max_size=SEARCH_CACHE_SIZE)
+products_adapter = TypeAdapter(List[Product])
 
 # ---------------------------------------------------------
 # 3) Конечная точка: GET /product/{product_id}
@@ -34,28 +55,61 @@ products_db = [
 def get_product(
     product_id: int = Path(..., title="ID товара", ge=1)
 ):
-    for prod in products_db:
-        if prod.product_id == product_id:
-            return prod
+    prod = products_db.get(product_id)
+    if prod is not None:
+        return prod
     raise HTTPException(status_code=404, detail=f"Товар с product_id={product_id} не найден")
 
 # ---------------------------------------------------------
 # 4) Конечная точка: GET /products/search
 #    Поиск по ключевому слову в названии с опциональной фильтрацией по категории
-#    и ограничением числа возвращаемых результатов
+#    и диапазону цены, сортировкой по цене и постраничным выводом (offset/limit)
 # ---------------------------------------------------------
 @app.get("/products/search", response_model=List[Product])
 def search_products(
     keyword: str = Query(..., min_length=1, title="Ключевое слово для поиска"),
     category: Optional[str] = Query(None, title="Категория"),
+    min_price: Optional[float] = Query(None, ge=0, title="Минимальная цена"),
+    max_price: Optional[float] = Query(None, ge=0, title="Максимальная цена"),
+    sort: Optional[Literal["price_asc", "price_desc"]] = Query(None, title="Сортировка по цене"),
+    offset: int = Query(0, ge=0, title="Сколько результатов пропустить"),
     limit: int = Query(10, ge=1, le=100, title="Максимальное количество результатов")
 ):
-    keyword_lower = keyword.lower()
-    # Фильтрация
-    filtered = [
-        prod for prod in products_db
-        if keyword_lower in prod.name.lower()
-           and (category is None or prod.category.lower() == category.lower())
-    ]
-    # Ограничение по количеству
-    return filtered[:limit]
+    key = (keyword.lower(), category.lower() if category is not None else None,
+           min_price, max_price, sort, offset, limit)
+    version = products_db.version
+    cached = search_cache.get(key, version)
+    if cached is None:
+        # Фильтрация по индексу и колонкам, объекты создаются только для страницы ответа
+        cached = products_db.search(
+            keyword,
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            sort=sort,
+            offset=offset,
+            limit=limit
+        )
+        if SEARCH_CACHE_JSON:
+            cached = products_adapter.dump_json(cached)
+        search_cache.put(key, version, cached)
+
+    if SEARCH_CACHE_JSON:
+        return Response(content=cached, media_type="application/json")
+    return cached
+
+# ---------------------------------------------------------
+# 5) Конечная точка: GET /products/stats
+#    Количество товаров и минимальная/максимальная/средняя цена по категориям
+# ---------------------------------------------------------
+@app.get("/products/stats", response_model=List[CategoryStats])
+def products_stats():
+    return products_db.category_stats()
+
+# ---------------------------------------------------------
+# 6) Конечная точка: GET /products/cache/stats
+#    Статистика кэша результатов поиска (доля попаданий, вытеснения)
+# ---------------------------------------------------------
+@app.get("/products/cache/stats")
+def search_cache_stats():
+    return search_cache.stats()
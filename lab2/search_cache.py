@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class SearchCache:
+    """
+    Ограниченный по размеру LRU-кэш результатов поиска.
+
+    Вместе с результатом хранится версия каталога, для которой он посчитан.
+    Если каталог с тех пор менялся, запись считается устаревшей и удаляется
+    при следующем обращении - явная очистка кэша не нужна.
+
+    Синхронные обработчики FastAPI выполняются в пуле потоков, поэтому
+    все изменения OrderedDict идут под self._lock.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, value = entry
+            if entry_version != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+        }
@@ -0,0 +1,107 @@
+# bench_persistence.py
+"""
+Холодный старт и стоимость журнала для UserStore.
+
+1) Заполняет хранилище --users пользователями, пишет снапшот и --tail
+   изменений в журнал после него, затем замеряет восстановление
+   в новом процессе-хранилище (mmap снапшота + хвост журнала).
+2) Сравнивает скорость create/update без журнала, с асинхронным журналом
+   и с sync=True (ожидание группового fsync).
+
+Запуск из каталога lab3:
+    python bench_persistence.py --users 1000000 --tail 10000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from bench_store import fields
+from persistence import UserJournal
+from store import UserStore
+
+
+def fill(store: UserStore, users: int) -> None:
+    for n in range(users):
+        store.create(fields(n))
+
+
+def cold_start(directory: str, users: int, tail: int) -> dict:
+    store = UserStore()
+    journal = UserJournal(directory)
+    journal.recover(store)
+    store.journal = journal
+    fill(store, users)
+
+    started = time.perf_counter()
+    journal.snapshot(store)
+    snapshot_seconds = time.perf_counter() - started
+    for n in range(tail):
+        store.update(n + 1, fields(users + n))
+    journal.flush()
+    journal.close()
+
+    started = time.perf_counter()
+    restored = UserStore()
+    UserJournal(directory).recover(restored)
+    recover_seconds = time.perf_counter() - started
+    assert len(restored) == users, len(restored)
+    assert restored.get(1).username == f"user{users}"
+    return {
+        "snapshot_mb": round(os.path.getsize(os.path.join(directory, "users.snapshot")) / 2 ** 20, 1),
+        "snapshot_seconds": round(snapshot_seconds, 2),
+        "recover_seconds": round(recover_seconds, 2),
+    }
+
+
+def write_throughput(directory: str, sync: bool, ops: int, threads: int) -> int:
+    store = UserStore()
+    journal = None
+    if directory:
+        journal = UserJournal(directory, sync=sync)
+        journal.recover(store)
+        journal.start(store)
+        store.journal = journal
+
+    def worker(seed: int):
+        for i in range(ops):
+            n = seed * ops + i
+            store.create(fields(n))
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    if journal is not None:
+        journal.close()
+    return round(ops * threads / elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--tail", type=int, default=10_000, help="изменений в журнале после снапшота")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=2_000, help="операций create на поток")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="users-bench-")
+    try:
+        print(f"cold start {args.users} users: {cold_start(os.path.join(root, 'cold'), args.users, args.tail)}")
+        for name, directory, sync in (
+            ("memory", None, False),
+            ("wal async", os.path.join(root, "async"), False),
+            ("wal sync", os.path.join(root, "sync"), True),
+        ):
+            print(f"create ops/s {name:9}: {write_throughput(directory, sync, args.ops, args.threads)}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# bench_store.py
+"""
+Нагрузочная проверка и бенчмарк UserStore в сравнении с прежним списком.
+
+1) stress: несколько потоков одновременно создают, меняют, удаляют и читают
+   пользователей с пересекающимися username; после прогона проверяются
+   инварианты хранилища (индексы согласованы, ID и username уникальны).
+2) bench: пропускная способность get/update/delete на заполненном хранилище.
+
+Запуск из каталога lab3:
+    python bench_store.py --users 10000 --threads 8
+"""
+import argparse
+import random
+import threading
+import time
+from typing import List, Optional
+
+from models import User
+from store import DuplicateUserError, UserStore
+
+
+class ListStore:
+    """Прежняя реализация: список и линейный поиск, ID = len(db) + 1"""
+
+    def __init__(self):
+        self.db: List[User] = []
+
+    def list(self) -> List[User]:
+        return self.db
+
+    def get(self, user_id: int) -> Optional[User]:
+        for u in self.db:
+            if u.id == user_id:
+                return u
+        return None
+
+    def create(self, fields: dict) -> User:
+        user = User(id=len(self.db) + 1, **fields)
+        self.db.append(user)
+        return user
+
+    def update(self, user_id: int, fields: dict) -> Optional[User]:
+        for idx, u in enumerate(self.db):
+            if u.id == user_id:
+                self.db[idx] = User(id=user_id, **fields)
+                return self.db[idx]
+        return None
+
+    def delete(self, user_id: int) -> bool:
+        for idx, u in enumerate(self.db):
+            if u.id == user_id:
+                self.db.pop(idx)
+                return True
+        return False
+
+
+def fields(n: int) -> dict:
+    return {"username": f"user{n}", "email": f"user{n}@example.com", "age": 20 + n % 50}
+
+
+def problems(store) -> List[str]:
+    """Нарушения инвариантов хранилища"""
+    users = store.list()
+    found = []
+    if len({u.id for u in users}) != len(users):
+        found.append("duplicate ids")
+    if len({u.username for u in users}) != len(users):
+        found.append("duplicate usernames")
+    if isinstance(store, UserStore):
+        if {store._by_username[u.username] for u in users} != {u.id for u in users}:
+            found.append("username index out of sync")
+        if len(store._by_email) != len(users) or len(store._by_username) != len(users):
+            found.append("stale index entries")
+    return found
+
+
+def stress(store, threads: int, ops: int, key_space: int) -> dict:
+    errors = []
+
+    def worker(seed: int):
+        rnd = random.Random(seed)
+        for _ in range(ops):
+            op = rnd.random()
+            n = rnd.randrange(key_space)
+            try:
+                if op < 0.4:
+                    store.create(fields(n))
+                elif op < 0.6:
+                    store.update(rnd.randrange(1, key_space * 2), fields(n))
+                elif op < 0.8:
+                    store.delete(rnd.randrange(1, key_space * 2))
+                else:
+                    store.get(rnd.randrange(1, key_space * 2))
+                    store.list()
+            except DuplicateUserError:
+                pass
+            except Exception as e:  # noqa: BLE001 - любая другая ошибка означает порчу данных
+                errors.append(repr(e))
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "errors": errors[:3],
+        "problems": problems(store),
+        "users": len(store.list()),
+    }
+
+
+def bench(store_factory, users: int, ops: int, threads: int) -> dict:
+    store = store_factory()
+    for n in range(users):
+        store.create(fields(n))
+    results = {}
+    for name in ("get", "update", "delete"):
+        def worker(seed: int):
+            rnd = random.Random(seed)
+            for i in range(ops):
+                user_id = rnd.randrange(1, users + 1)
+                if name == "get":
+                    store.get(user_id)
+                elif name == "update":
+                    store.update(user_id, fields(user_id - 1))
+                else:
+                    store.delete(user_id)
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+        results[name] = round(ops * threads / elapsed)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=2_000, help="операций на поток")
+    args = parser.parse_args()
+
+    for name, factory in (("UserStore", UserStore), ("list", ListStore)):
+        result = stress(factory(), args.threads, args.ops, key_space=500)
+        print(f"stress {name:9}: {result}")
+
+    for name, factory in (("UserStore", UserStore), ("list", ListStore)):
+        ops = args.ops if factory is UserStore else max(1, args.ops // 20)
+        print(f"bench  {name:9}: ops/s {bench(factory, args.users, ops, args.threads)}")
+
+
+if __name__ == "__main__":
+    main()
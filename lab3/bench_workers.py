@@ -0,0 +1,129 @@
+# bench_workers.py
+"""
+Масштабирование lab3 на несколько воркеров uvicorn.
+
+Для каждого бэкенда (memory, sqlite) и числа воркеров поднимается
+`uvicorn main:app --workers N`, затем --clients процессов-клиентов
+в течение --seconds шлют смесь запросов (20% POST /users/, 80% GET /users/{id})
+по keep-alive соединениям (первые --warmup секунд не учитываются). После прогона проверяется согласованность:
+сколько пользователей видят разные соединения (разные воркеры) и нет ли
+повторяющихся ID. У memory каждый воркер хранит свое - это и видно в проверке.
+
+Запуск из каталога lab3:
+    python bench_workers.py --workers 1 2 4 8 --clients 16 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, **env}
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def request(conn: http.client.HTTPConnection, method: str, url: str, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, url, body=json.dumps(body) if body is not None else None, headers=headers)
+    if hasattr(socket, "TCP_QUICKACK"):
+        # С --workers > 1 uvicorn не включает TCP_NODELAY на принятых соединениях:
+        # без немедленного ACK каждый ответ ждал бы ~40 мс (Nagle + delayed ACK)
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def client(port: int, warmup: float, seconds: float, seed: int, results) -> None:
+    rnd = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    done = 0
+    measure_from = time.monotonic() + warmup  # пока воркеры прогреваются, запросы не считаем
+    deadline = measure_from + seconds
+    while (now := time.monotonic()) < deadline:
+        if rnd.random() < 0.2:
+            n = rnd.getrandbits(48)
+            request(conn, "POST", "/users/", {"username": f"user{seed}_{n}", "email": f"u{seed}_{n}@example.com",
+                                               "password": "secret1"})
+        else:
+            request(conn, "GET", f"/users/{rnd.randrange(1, 1000)}")
+        done += now >= measure_from
+    conn.close()
+    results.put(done)
+
+
+def consistency(port: int, probes: int = 16) -> dict:
+    """Что видят разные соединения после прогона"""
+    counts, duplicate_ids = set(), False
+    for _ in range(probes):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        _, body = request(conn, "GET", "/users/")
+        conn.close()
+        ids = [u["id"] for u in json.loads(body)]
+        counts.add(len(ids))
+        duplicate_ids |= len(ids) != len(set(ids))
+    return {"views": sorted(counts), "consistent": len(counts) == 1, "duplicate_ids": duplicate_ids}
+
+
+def run(backend: str, workers: int, clients: int, warmup: float, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(port, workers, {"USERS_BACKEND": backend,
+                                              "USERS_DB_PATH": os.path.join(tmp, "users.db")})
+        try:
+            results = multiprocessing.Queue()
+            pool = [multiprocessing.Process(target=client, args=(port, warmup, seconds, seed, results))
+                    for seed in range(clients)]
+            for p in pool:
+                p.start()
+            total = sum(results.get() for _ in pool)
+            for p in pool:
+                p.join()
+            return {"rps": round(total / seconds), **consistency(port)}
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"cpu cores: {os.cpu_count()}")
+    for backend in args.backends:
+        for workers in sorted(set(args.workers)):
+            print(f"{backend:6} workers={workers:2}: {run(backend, workers, args.clients, args.warmup, args.seconds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,45 @@
 # main.py
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from routers.users import router  # <-- импортируем наш роутер
+from routers.users import router, db, USERS_BACKEND  # <-- импортируем наш роутер и хранилище
+from persistence import UserJournal
+
+# Каталог для журнала и снапшотов хранилища в памяти; если не задан - данные живут только в памяти.
+# Бэкенду sqlite журнал не нужен: он сам хранит данные на диске
+USERS_DATA_DIR = os.getenv("USERS_DATA_DIR")
+# 1 - запрос ждет fsync своей группы записей; 0 - запись на диск в фоне
+USERS_WAL_SYNC = os.getenv("USERS_WAL_SYNC", "0") == "1"
+USERS_WAL_FLUSH_INTERVAL = float(os.getenv("USERS_WAL_FLUSH_INTERVAL", "0.005"))
+USERS_SNAPSHOT_INTERVAL = float(os.getenv("USERS_SNAPSHOT_INTERVAL", "300"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Восстанавливаем пользователей из снапшота и журнала при старте, пишем снапшот при остановке"""
+    journal = None
+    if USERS_DATA_DIR and USERS_BACKEND == "memory":
+        journal = UserJournal(
+            USERS_DATA_DIR,
+            sync=USERS_WAL_SYNC,
+            flush_interval=USERS_WAL_FLUSH_INTERVAL,
+            snapshot_interval=USERS_SNAPSHOT_INTERVAL
+        )
+        journal.recover(db)
+        journal.start(db)
+        db.journal = journal
+    yield
+    if journal is not None:
+        db.journal = None
+        journal.close(db)
+
 
 app = FastAPI(
     title="Lab3: Users CRUD API",
     version="1.0.0",
-    description="Простейший CRUD для пользователей"
+    description="Простейший CRUD для пользователей",
+    lifespan=lifespan
 )
 
-app.include_router(router)
\ No newline at end of file
+app.include_router(router)
@@ -0,0 +1,283 @@
+# persistence.py
+"""
+Журнал упреждающей записи (WAL) и снапшоты для UserStore.
+
+Каталог данных:
+    users.snapshot            - компактный бинарный снапшот всех пользователей на момент LSN
+    wal-<первый LSN>.log      - сегменты журнала; каждое изменение - одна запись
+
+Запись журнала: op (1 байт), LSN (8), длина данных (4), данные, CRC32 (4).
+При старте снапшот читается через mmap, затем применяются только записи
+журнала с LSN больше, чем у снапшота. Недописанная запись в конце журнала
+(падение процесса посреди записи) отбрасывается, а сегмент обрезается
+по последней целой записи - новые записи не должны оказаться после мусора.
+Создание, переименование и удаление файлов закрепляется fsync каталога.
+
+Запись в журнал - это добавление байтов в буфер; фоновый поток раз в
+flush_interval пишет накопленную группу записей одним write + fsync.
+При sync=True операция возвращается только после fsync своей группы.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+from models import User
+
+OP_PUT = 1
+OP_DELETE = 2
+
+RECORD_HEADER = struct.Struct("<BQI")      # op, lsn, длина данных
+RECORD_CRC = struct.Struct("<I")
+USER_HEADER = struct.Struct("<qiHH")       # id, age (-1 = нет), длина username, длина email
+DELETE_PAYLOAD = struct.Struct("<q")
+SNAPSHOT_HEADER = struct.Struct("<4sHqqq")  # magic, версия формата, LSN, следующий ID, число записей
+SNAPSHOT_MAGIC = b"USNP"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_NAME = "users.snapshot"
+
+
+def encode_user(user: User) -> bytes:
+    username = user.username.encode()
+    email = str(user.email).encode()
+    age = user.age if user.age is not None else -1
+    return USER_HEADER.pack(user.id, age, len(username), len(email)) + username + email
+
+
+def decode_user(buffer, offset: int) -> Tuple[User, int]:
+    """Пользователь из буфера и смещение следующей записи"""
+    user_id, age, username_len, email_len = USER_HEADER.unpack_from(buffer, offset)
+    offset += USER_HEADER.size
+    username = bytes(buffer[offset:offset + username_len]).decode()
+    offset += username_len
+    email = bytes(buffer[offset:offset + email_len]).decode()
+    offset += email_len
+    # Данные уже проверялись при записи, повторная валидация не нужна
+    user = User.model_construct(id=user_id, username=username, email=email, age=None if age < 0 else age)
+    return user, offset
+
+
+class UserJournal:
+    """WAL с групповым fsync и периодическими снапшотами для UserStore"""
+
+    def __init__(self, directory: str, sync: bool = False, flush_interval: float = 0.005,
+                 snapshot_interval: float = 300.0):
+        self.directory = directory
+        self.sync = sync
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._buffer = bytearray()
+        self._lsn = 0
+        self._flushed_lsn = 0
+        self._snapshot_lsn = 0
+        self._file = None
+        self._closing = False
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+
+    # ---------- восстановление ----------
+
+    def recover(self, store) -> None:
+        """Загружает снапшот и хвост журнала в store, открывает новый сегмент журнала"""
+        users, next_id = self._load_snapshot()
+        store.restore(users, next_id)
+        for op, lsn, payload in self._read_segments():
+            if lsn <= self._snapshot_lsn:
+                continue
+            if op == OP_PUT:
+                store.apply_put(decode_user(payload, 0)[0])
+            elif op == OP_DELETE:
+                store.apply_delete(DELETE_PAYLOAD.unpack_from(payload)[0])
+            self._lsn = lsn
+        self._lsn = max(self._lsn, self._snapshot_lsn)
+        self._flushed_lsn = self._lsn
+        self._open_segment()
+
+    def _load_snapshot(self) -> Tuple[Iterator[User], int]:
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return iter(()), 1
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, lsn, next_id, count = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise RuntimeError(f"{path}: неизвестный формат снапшота")
+        body_end = len(data) - RECORD_CRC.size
+        if zlib.crc32(memoryview(data)[SNAPSHOT_HEADER.size:body_end]) != RECORD_CRC.unpack_from(data, body_end)[0]:
+            raise RuntimeError(f"{path}: контрольная сумма снапшота не совпадает")
+        self._snapshot_lsn = lsn
+
+        def users() -> Iterator[User]:
+            offset = SNAPSHOT_HEADER.size
+            for _ in range(count):
+                user, offset = decode_user(data, offset)
+                yield user
+            data.close()
+
+        return users(), next_id
+
+    def _segments(self) -> List[str]:
+        names = [name for name in os.listdir(self.directory) if name.startswith("wal-") and name.endswith(".log")]
+        return sorted(names, key=lambda name: int(name[4:-4]))
+
+    def _read_segments(self) -> Iterator[Tuple[int, int, bytes]]:
+        for name in self._segments():
+            with open(os.path.join(self.directory, name), "rb") as f:
+                data = f.read()
+            offset = 0
+            while offset + RECORD_HEADER.size <= len(data):
+                op, lsn, length = RECORD_HEADER.unpack_from(data, offset)
+                end = offset + RECORD_HEADER.size + length
+                if end + RECORD_CRC.size > len(data):
+                    break  # запись не дописана
+                if zlib.crc32(data[offset:end]) != RECORD_CRC.unpack_from(data, end)[0]:
+                    break
+                yield op, lsn, data[offset + RECORD_HEADER.size:end]
+                offset = end + RECORD_CRC.size
+            if offset < len(data):
+                # Иначе _open_segment может дописывать в этот же файл после мусора,
+                # и следующее восстановление потеряет все новые записи
+                with open(os.path.join(self.directory, name), "r+b") as f:
+                    f.truncate(offset)
+                    os.fsync(f.fileno())
+
+    def _open_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.directory, f"wal-{self._lsn + 1:020d}.log")
+        self._file = open(path, "ab")
+        self._fsync_directory()
+
+    def _fsync_directory(self) -> None:
+        """Закрепляет на диске записи каталога (новые, переименованные и удаленные файлы)"""
+        if not hasattr(os, "O_DIRECTORY"):
+            return  # Windows: каталог так не открыть
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # ---------- запись ----------
+
+    def log_put(self, user: User) -> int:
+        return self._append(OP_PUT, encode_user(user))
+
+    def log_delete(self, user_id: int) -> int:
+        return self._append(OP_DELETE, DELETE_PAYLOAD.pack(user_id))
+
+    def _append(self, op: int, payload: bytes) -> int:
+        with self._cond:
+            self._lsn += 1
+            record = RECORD_HEADER.pack(op, self._lsn, len(payload)) + payload
+            self._buffer += record
+            self._buffer += RECORD_CRC.pack(zlib.crc32(record))
+            self._cond.notify_all()
+            return self._lsn
+
+    def wait(self, lsn: int) -> None:
+        """В режиме sync ждет, пока запись с этим LSN не окажется на диске"""
+        if not self.sync:
+            return
+        with self._cond:
+            while self._flushed_lsn < lsn and not self._closing:
+                self._cond.wait()
+
+    def flush(self) -> None:
+        """Пишет накопленные записи одной группой и делает fsync"""
+        with self._io_lock:
+            with self._cond:
+                data, self._buffer = self._buffer, bytearray()
+                lsn = self._lsn
+            if data:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            with self._cond:
+                self._flushed_lsn = lsn
+                self._cond.notify_all()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return
+            time.sleep(self.flush_interval)  # даем группе записей накопиться
+            self.flush()
+
+    # ---------- снапшоты ----------
+
+    def snapshot(self, store) -> None:
+        """
+        Снапшот на текущий LSN. Запись в хранилище блокируется только на время
+        сброса буфера журнала и копирования списка пользователей; кодирование
+        и запись файла идут уже без блокировок.
+        """
+        with store.all_locked():
+            self.flush()
+            lsn = self._lsn
+            if lsn == self._snapshot_lsn:
+                return
+            old_segments = self._segments()
+            with self._io_lock:
+                self._open_segment()
+            users = store.list()
+            next_id = store.peek_next_id()
+
+        body = bytearray()
+        for user in users:
+            body += encode_user(user)
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, lsn, next_id, len(users)))
+            f.write(body)
+            f.write(RECORD_CRC.pack(zlib.crc32(body)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        # Старые сегменты можно удалять, только когда переименование уже на диске
+        self._fsync_directory()
+        self._snapshot_lsn = lsn
+
+        # Все записи старых сегментов уже вошли в снапшот
+        for name in old_segments:
+            os.remove(os.path.join(self.directory, name))
+        self._fsync_directory()
+
+    def _snapshot_loop(self, store) -> None:
+        while not self._stop.wait(self.snapshot_interval):
+            self.snapshot(store)
+
+    # ---------- жизненный цикл ----------
+
+    def start(self, store) -> None:
+        """Запускает фоновые потоки: групповой fsync и периодические снапшоты"""
+        self._threads = [
+            threading.Thread(target=self._flush_loop, name="users-wal-flush", daemon=True),
+            threading.Thread(target=self._snapshot_loop, args=(store,), name="users-snapshot", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self, store: Optional[object] = None) -> None:
+        """Останавливает фоновые потоки, сбрасывает журнал и (если передан store) пишет снапшот"""
+        self._stop.set()
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self.flush()
+        if store is not None:
+            self.snapshot(store)
+        self._file.close()
+        self._file = None
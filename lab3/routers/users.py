@@ -1,31 +1,38 @@
 # routers/users.py
+import os
+
 from fastapi import APIRouter, HTTPException, Path
 from typing import List
 from models import User, UserCreate
+from store import DuplicateUserError, open_store
+
+# memory - данные в памяти процесса (один воркер); sqlite - общий файл для всех воркеров
+USERS_BACKEND = os.getenv("USERS_BACKEND", "memory")
+USERS_DB_PATH = os.getenv("USERS_DB_PATH", "users.db")
 
 router = APIRouter(prefix="/users", tags=["users"])
-db: List[User] = []
+db = open_store(USERS_BACKEND, USERS_DB_PATH)
 
 
 @router.get("/", response_model=List[User], summary="Список всех пользователей")
 def list_users():
-    return db
+    return db.list()
 
 
 @router.get("/{user_id}", response_model=User, summary="Получить пользователя по ID")
 def get_user(user_id: int = Path(..., gt=0, description="ID пользователя (>0)")):
-    for u in db:
-        if u.id == user_id:
-            return u
+    user = db.get(user_id)
+    if user is not None:
+        return user
     raise HTTPException(status_code=404, detail="User not found")
 
 
 @router.post("/", response_model=User, status_code=201, summary="Создать нового пользователя")
 def create_user(user_in: UserCreate):
-    new_id = len(db) + 1
-    user = User(id=new_id, **user_in.dict(exclude={"password"}))
-    db.append(user)
-    return user
+    try:
+        return db.create(user_in.dict(exclude={"password"}))
+    except DuplicateUserError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.put("/{user_id}", response_model=User, summary="Обновить пользователя")
@@ -33,18 +40,17 @@ def update_user(
         user_id: int = Path(..., gt=0, description="ID пользователя (>0)"),
         user_in: UserCreate = ...
 ):
-    for idx, u in enumerate(db):
-        if u.id == user_id:
-            updated = User(id=user_id, **user_in.dict(exclude={"password"}))
-            db[idx] = updated
-            return updated
+    try:
+        updated = db.update(user_id, user_in.dict(exclude={"password"}))
+    except DuplicateUserError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if updated is not None:
+        return updated
     raise HTTPException(status_code=404, detail="User not found")
 
 
 @router.delete("/{user_id}", status_code=204, summary="Удалить пользователя")
 def delete_user(user_id: int = Path(..., gt=0, description="ID пользователя (>0)")):
-    for idx, u in enumerate(db):
-        if u.id == user_id:
-            db.pop(idx)
-            return
+    if db.delete(user_id):
+        return
     raise HTTPException(status_code=404, detail="User not found")
@@ -0,0 +1,255 @@
+# store.py
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from models import User
+
+
+class DuplicateUserError(Exception):
+    """Пользователь с таким username или email уже существует."""
+
+
+class UserStore:
+    """
+    Потокобезопасное хранилище пользователей в памяти.
+
+    - словарь id -> User, поиск/обновление/удаление за O(1);
+    - монотонный счетчик ID: после удаления номера не переиспользуются;
+    - уникальные индексы по username и email (email без учета регистра);
+    - lock striping: каждая операция берет только блокировки "своих" ключей
+      (id, username, email), упорядоченные по номеру, поэтому запросы
+      к разным пользователям из пула потоков FastAPI не ждут друг друга.
+
+    Если подключен журнал (persistence.UserJournal), каждое изменение
+    записывается в него под теми же блокировками, что и в память.
+    """
+
+    def __init__(self, stripes: int = 64, journal=None):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._id_lock = threading.Lock()
+        self._next_id = 1
+        self.journal = journal
+        self._by_id: Dict[int, User] = {}
+        self._by_username: Dict[str, int] = {}
+        self._by_email: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def list(self) -> List[User]:
+        return list(self._by_id.values())
+
+    def get(self, user_id: int) -> Optional[User]:
+        return self._by_id.get(user_id)
+
+    def create(self, fields: dict) -> User:
+        """Создает пользователя с новым ID; DuplicateUserError при занятом username/email"""
+        user = User(id=self._allocate_id(), **fields)
+        with self._locked(user):
+            self._check_unique(user)
+            self._insert(user)
+            lsn = self.journal.log_put(user) if self.journal else None
+        if lsn is not None:
+            self.journal.wait(lsn)
+        return user
+
+    def update(self, user_id: int, fields: dict) -> Optional[User]:
+        """Заменяет данные пользователя; None, если его нет"""
+        updated = User(id=user_id, **fields)
+        while True:
+            current = self._by_id.get(user_id)
+            if current is None:
+                return None
+            with self._locked(current, updated):
+                # Пока ждали блокировки, пользователя могли изменить - тогда повторяем
+                if self._by_id.get(user_id) is not current:
+                    continue
+                self._check_unique(updated, exclude_id=user_id)
+                self._remove(current)
+                self._insert(updated)
+                lsn = self.journal.log_put(updated) if self.journal else None
+            if lsn is not None:
+                self.journal.wait(lsn)
+            return updated
+
+    def delete(self, user_id: int) -> bool:
+        """Удаляет пользователя; False, если его нет"""
+        while True:
+            current = self._by_id.get(user_id)
+            if current is None:
+                return False
+            with self._locked(current):
+                if self._by_id.get(user_id) is not current:
+                    continue
+                self._remove(current)
+                lsn = self.journal.log_delete(user_id) if self.journal else None
+            if lsn is not None:
+                self.journal.wait(lsn)
+            return True
+
+    # ---------- восстановление из снапшота и журнала (до начала обработки запросов) ----------
+
+    def restore(self, users: Iterable[User], next_id: int) -> None:
+        for user in users:
+            self._insert(user)
+        self._next_id = max(next_id, self._next_id)
+
+    def apply_put(self, user: User) -> None:
+        current = self._by_id.get(user.id)
+        if current is not None:
+            self._remove(current)
+        self._insert(user)
+        self._next_id = max(self._next_id, user.id + 1)
+
+    def apply_delete(self, user_id: int) -> None:
+        current = self._by_id.get(user_id)
+        if current is not None:
+            self._remove(current)
+
+    def peek_next_id(self) -> int:
+        with self._id_lock:
+            return self._next_id
+
+    def _allocate_id(self) -> int:
+        with self._id_lock:
+            user_id = self._next_id
+            self._next_id += 1
+            return user_id
+
+    def _check_unique(self, user: User, exclude_id: Optional[int] = None) -> None:
+        for index, key in ((self._by_username, user.username), (self._by_email, user.email.lower())):
+            owner = index.get(key)
+            if owner is not None and owner != exclude_id:
+                raise DuplicateUserError("User with this username or email already exists")
+
+    def _insert(self, user: User) -> None:
+        self._by_id[user.id] = user
+        self._by_username[user.username] = user.id
+        self._by_email[user.email.lower()] = user.id
+
+    def _remove(self, user: User) -> None:
+        del self._by_id[user.id]
+        del self._by_username[user.username]
+        del self._by_email[user.email.lower()]
+
+    @contextmanager
+    def all_locked(self) -> Iterator[None]:
+        """Все блокировки сразу - согласованный срез хранилища (для снапшота)"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    @contextmanager
+    def _locked(self, *users: User) -> Iterator[None]:
+        """Берет блокировки всех ключей пользователей в порядке номеров (без взаимных блокировок)"""
+        keys = set()
+        for user in users:
+            keys.update((("id", user.id), ("username", user.username), ("email", user.email.lower())))
+        stripes = sorted({hash(key) % len(self._locks) for key in keys})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+
+
+class SqliteUserStore:
+    """
+    Хранилище пользователей во встроенной SQLite - общее для всех процессов.
+
+    Несколько воркеров uvicorn/gunicorn открывают один файл и видят одни
+    и те же данные. ID выдает AUTOINCREMENT (монотонный, без переиспользования
+    и без гонок между процессами), уникальность username/email (email без учета
+    регистра) обеспечивают индексы, каждая операция - одна транзакция.
+    У каждого потока свое соединение.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL UNIQUE,
+                    email TEXT NOT NULL,
+                    email_key TEXT NOT NULL UNIQUE,
+                    age INTEGER
+                )
+                """
+            )
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def list(self) -> List[User]:
+        rows = self._connection().execute("SELECT id, username, email, age FROM users ORDER BY id")
+        return [self._user(row) for row in rows]
+
+    def get(self, user_id: int) -> Optional[User]:
+        row = self._connection().execute(
+            "SELECT id, username, email, age FROM users WHERE id = ?", (user_id,)
+        ).fetchone()
+        return self._user(row) if row is not None else None
+
+    def create(self, fields: dict) -> User:
+        """Создает пользователя с новым ID; DuplicateUserError при занятом username/email"""
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "INSERT INTO users (username, email, email_key, age) VALUES (?, ?, ?, ?) RETURNING id",
+                    (fields["username"], fields["email"], fields["email"].lower(), fields.get("age"))
+                ).fetchone()
+        except sqlite3.IntegrityError:
+            raise DuplicateUserError("User with this username or email already exists")
+        return User(id=row[0], **fields)
+
+    def update(self, user_id: int, fields: dict) -> Optional[User]:
+        """Заменяет данные пользователя; None, если его нет"""
+        updated = User(id=user_id, **fields)
+        try:
+            with self._connection() as conn:
+                changed = conn.execute(
+                    "UPDATE users SET username = ?, email = ?, email_key = ?, age = ? WHERE id = ?",
+                    (fields["username"], fields["email"], fields["email"].lower(), fields.get("age"), user_id)
+                ).rowcount
+        except sqlite3.IntegrityError:
+            raise DuplicateUserError("User with this username or email already exists")
+        return updated if changed else None
+
+    def delete(self, user_id: int) -> bool:
+        """Удаляет пользователя; False, если его нет"""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM users WHERE id = ?", (user_id,)).rowcount > 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _user(row) -> User:
+        user_id, username, email, age = row
+        return User.model_construct(id=user_id, username=username, email=email, age=age)
+
+
+def open_store(backend: str = "memory", path: str = "users.db"):
+    """Хранилище по имени бэкенда: memory - в памяти процесса, sqlite - общее для воркеров"""
+    if backend == "memory":
+        return UserStore()
+    if backend == "sqlite":
+        return SqliteUserStore(path)
+    raise ValueError(f"unknown users backend: {backend}")
@@ -0,0 +1,189 @@
+"""
+Синхронные и асинхронные эндпоинты lab4 под конкурентной нагрузкой.
+
+Для каждого DB_MODE (sync, async) во временном каталоге поднимается
+`uvicorn main:app` (один воркер), таблица заполняется через POST /users/bulk,
+после чего для каждого числа клиентов из --clients столько же keep-alive
+соединений в течение --seconds шлют запросы: 90% GET /users/{id},
+10% PUT /users/{id} (новый возраст). Кэш пользователей выключен
+(USER_CACHE_SIZE=0), чтобы каждое чтение доходило до БД. Первые --warmup
+секунд не учитываются. Выводятся запросы в секунду, p50/p99 и число ошибок
+(ответы не 2xx, оборванные соединения и запросы, не получившие ответа
+через DRAIN_TIMEOUT секунд после конца замера).
+
+Синхронный эндпоинт занимает поток из пула FastAPI (40 потоков) на все время
+запроса, асинхронный - только пока выполняется Python-код.
+
+Запуск из каталога lab4:
+    python bench_async.py --users 10000 --clients 1 64 512 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_FILES = ("main.py", "database.py", "database_async.py", "models.py", "schemas.py",
+             "passwords.py", "user_cache.py", "user_search.py", "routers")
+
+DRAIN_TIMEOUT = 5
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, port: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env={**os.environ, **env}
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+class Connection:
+    """Минимальный HTTP/1.1 клиент с keep-alive: нагрузку не должен ограничивать сам клиент"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method: str, url: str, body: bytes = b"",
+                      content_type: str = "application/json") -> tuple:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        head = f"{method} {url} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(body)}\r\n"
+        if body:
+            head += f"Content-Type: {content_type}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + body)
+        try:
+            status_line = await self.reader.readuntil(b"\r\n")
+            headers = await self.reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.close()
+            raise ConnectionError("connection closed")
+        length = 0
+        for line in headers.decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return int(status_line.split()[1]), await self.reader.readexactly(length)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def fill(port: int, users: int) -> None:
+    conn = Connection(port)
+    body = "".join(json.dumps({"username": f"user{n}", "email": f"user{n}@example.com",
+                               "password": "password", "age": 20 + n % 50}) + "\n"
+                   for n in range(users)).encode()
+    status, response = await conn.request("POST", "/users/bulk", body, "application/x-ndjson")
+    conn.close()
+    if status != 200 or json.loads(response)["inserted"] != users:
+        raise RuntimeError(f"fill failed: {status} {response[:200]!r}")
+
+
+async def load(port: int, users: int, clients: int, seconds: float, warmup: float) -> dict:
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + seconds
+    latencies, errors = [], 0
+
+    async def client(seed: int) -> None:
+        nonlocal errors
+        rnd = random.Random(seed)
+        conn = Connection(port)
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            user_id = rnd.randrange(1, users + 1)
+            try:
+                if rnd.random() < 0.1:
+                    status, _ = await conn.request("PUT", f"/users/{user_id}",
+                                                   json.dumps({"age": rnd.randrange(1, 100)}).encode())
+                else:
+                    status, _ = await conn.request("GET", f"/users/{user_id}")
+            except ConnectionError:
+                status = 0
+            finished = time.perf_counter()
+            # Учитываем по времени завершения: запрос, начатый при прогреве, тоже попадает в замер
+            if measure_from <= finished <= deadline:
+                if 200 <= status < 300:
+                    latencies.append(finished - now)
+                else:
+                    errors += 1
+        conn.close()
+
+    tasks = [asyncio.create_task(client(i)) for i in range(clients)]
+    _, pending = await asyncio.wait(tasks, timeout=deadline + DRAIN_TIMEOUT - time.perf_counter())
+    # Запросы, не завершившиеся через DRAIN_TIMEOUT секунд после конца замера, - тоже ошибки
+    for task in pending:
+        task.cancel()
+    errors += len(pending)
+    await asyncio.gather(*pending, return_exceptions=True)
+    latencies.sort()
+    return {
+        "rps": len(latencies) / seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 64, 512])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'mode':<6} {'clients':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode in args.modes:
+        workdir = tempfile.mkdtemp(prefix="bench_async_")
+        for name in APP_FILES:
+            source = os.path.join(here, name)
+            if os.path.isdir(source):
+                shutil.copytree(source, os.path.join(workdir, name), ignore=shutil.ignore_patterns("__pycache__"))
+            else:
+                shutil.copy(source, workdir)
+        port = free_port()
+        server = start_server(workdir, port, {
+            "DB_MODE": mode, "USER_CACHE_SIZE": "0", "PASSWORD_SCRYPT_N": "16", "PASSWORD_HASH_WORKERS": "0"
+        })
+        try:
+            asyncio.run(fill(port, args.users))
+            for clients in args.clients:
+                result = asyncio.run(load(port, args.users, clients, args.seconds, args.warmup))
+                print(f"{mode:<6} {clients:>7} {result['rps']:>9.0f} {result['p50_ms']:>8.1f} "
+                      f"{result['p99_ms']:>8.1f} {result['errors']:>7}", flush=True)
+        finally:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
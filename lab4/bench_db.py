@@ -0,0 +1,160 @@
+"""
+Смешанная нагрузка чтение/запись на слой БД.
+
+Сравниваются два режима на одинаковой таблице пользователей:
+- legacy: как раньше - один движок без настроек (журнал DELETE), читатели
+  и писатели открывают сессии на нем и пишут напрямую;
+- split:  WAL и прагмы, пул соединений для чтения (ReadSessionLocal)
+  и единственный писатель с очередью (db_writer).
+--readers потоков читают пользователя по id, --writers потоков меняют
+возраст случайного пользователя. Выводятся чтения/записи в секунду,
+p50/p99 чтения и число ошибок (например, "database is locked").
+
+Запуск из каталога lab4:
+    python bench_db.py --users 10000 --readers 8 --writers 4 --seconds 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def fill(session_factory, users: int) -> None:
+    from models import User as UserModel
+    db = session_factory()
+    db.add_all([UserModel(username=f"user{n}", email=f"user{n}@example.com", age=20 + n % 50,
+                          hashed_password="x") for n in range(users)])
+    db.commit()
+    db.close()
+
+
+def run(read, write, users: int, readers: int, writers: int, seconds: float) -> dict:
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, counts = [], {"reads": 0, "writes": 0, "errors": 0}
+
+    def reader(seed: int):
+        rnd = random.Random(seed)
+        local = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                read(rnd.randrange(1, users + 1))
+                local.append(time.perf_counter() - started)
+            except OperationalError:
+                with lock:
+                    counts["errors"] += 1
+        with lock:
+            latencies.extend(local)
+            counts["reads"] += len(local)
+
+    def writer(seed: int):
+        rnd = random.Random(seed)
+        done = 0
+        while not stop.is_set():
+            try:
+                write(rnd.randrange(1, users + 1), rnd.randrange(1, 100))
+                done += 1
+            except OperationalError:
+                with lock:
+                    counts["errors"] += 1
+        with lock:
+            counts["writes"] += done
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(100 + i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        "reads_per_s": round(counts["reads"] / seconds),
+        "writes_per_s": round(counts["writes"] / seconds),
+        "read_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "read_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None,
+        "errors": counts["errors"],
+    }
+
+
+def legacy(args) -> dict:
+    from database import Base
+    from models import User as UserModel
+    engine = create_engine("sqlite:///./legacy.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    fill(session_factory, args.users)
+
+    def read(user_id: int):
+        db = session_factory()
+        try:
+            return db.query(UserModel).filter(UserModel.id == user_id).first()
+        finally:
+            db.close()
+
+    def write(user_id: int, age: int):
+        db = session_factory()
+        try:
+            db.query(UserModel).filter(UserModel.id == user_id).update({"age": age})
+            db.commit()
+        finally:
+            db.close()
+
+    return run(read, write, args.users, args.readers, args.writers, args.seconds)
+
+
+def split(args) -> dict:
+    from database import Base, ReadSessionLocal, SessionLocal, db_writer, engine
+    from models import User as UserModel
+    Base.metadata.create_all(bind=engine)
+    fill(SessionLocal, args.users)
+
+    def read(user_id: int):
+        db = ReadSessionLocal()
+        try:
+            return db.query(UserModel).filter(UserModel.id == user_id).first()
+        finally:
+            db.close()
+
+    def write(user_id: int, age: int):
+        def update(db):
+            db.query(UserModel).filter(UserModel.id == user_id).update({"age": age})
+            db.commit()
+        db_writer.run(update)
+
+    try:
+        return run(read, write, args.users, args.readers, args.writers, args.seconds)
+    finally:
+        db_writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    # database.py открывает ./lab4_users.db - работаем во временном каталоге
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        print(f"cpu cores: {os.cpu_count()}")
+        for name, mode in (("legacy", legacy), ("split", split)):
+            print(f"{name:6}: {mode(args)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Задержка "легких" эндпоинтов под потоком хеширования паролей.
+
+Для каждого режима поднимается uvicorn с отдельной временной БД:
+- inline: PASSWORD_HASH_WORKERS=0, scrypt считается в потоке запроса;
+- pool:   scrypt в пуле процессов (по числу ядер) с ограниченной очередью.
+Сначала замеряются p50/p99 GET /users/1 без нагрузки, затем то же самое,
+пока --flood потоков непрерывно создают пользователей (POST /users/).
+Также выводится, сколько хеширований выполнено и сколько получили 503.
+
+Запуск из каталога lab4:
+    python bench_hashing.py --flood 32 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+LAB_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, cwd: str, env: dict) -> subprocess.Popen:
+    # БД создается в текущем каталоге (sqlite:///./lab4_users.db) - запускаем во временном
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", LAB_DIR, "--port", str(port),
+         "--log-level", "warning"],
+        cwd=cwd, env={**os.environ, **env}, stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def request(conn: http.client.HTTPConnection, method: str, url: str, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, url, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def probe(port: int, seconds: float) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        assert request(conn, "GET", "/users/1") == 200
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.01)
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+    }
+
+
+def flood(port: int, stop: threading.Event, seed: int, counts: dict, lock: threading.Lock) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    n = 0
+    while not stop.is_set():
+        n += 1
+        status = request(conn, "POST", "/users/", {"username": f"flood{seed}_{n}",
+                                                    "email": f"flood{seed}_{n}@example.com",
+                                                    "password": "secret123"})
+        with lock:
+            counts[status] = counts.get(status, 0) + 1
+
+
+def run(mode: str, flooders: int, seconds: float) -> dict:
+    env = {"PASSWORD_HASH_WORKERS": "0"} if mode == "inline" else {}
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(port, tmp, env)
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            request(conn, "POST", "/users/", {"username": "probe", "email": "probe@example.com",
+                                              "password": "secret123"})
+            idle = probe(port, seconds / 2)
+
+            stop, lock, counts = threading.Event(), threading.Lock(), {}
+            pool = [threading.Thread(target=flood, args=(port, stop, seed, counts, lock))
+                    for seed in range(flooders)]
+            for t in pool:
+                t.start()
+            loaded = probe(port, seconds)
+            stop.set()
+            for t in pool:
+                t.join()
+            return {"idle": idle, "under_flood": loaded,
+                    "hashed_per_s": round(counts.get(201, 0) / seconds, 1), "rejected_503": counts.get(503, 0)}
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["inline", "pool"])
+    parser.add_argument("--flood", type=int, default=32, help="потоков, создающих пользователей")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"cpu cores: {os.cpu_count()}")
+    for mode in args.modes:
+        print(f"{mode:6}: {run(mode, args.flood, args.seconds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Задержка GET /users/search на большой таблице.
+
+Во временном каталоге создается БД lab4 с --users пользователями (username
+из случайных слогов и номера, email на нескольких сотнях доменов), затем
+индекс поиска заполняется командой backfill (ее время тоже выводится).
+После этого для каждого вида запроса --queries раз вызывается эндпоинт
+(в процессе, через TestClient) и выводятся p50/p99 в миллисекундах и среднее
+число найденных строк на странице:
+  exact     - username целиком;
+  prefix    - первые 5 символов username;
+  substring - 6 символов из середины username;
+  domain    - "@домен" (совпадает с тысячами строк);
+  page2     - вторая страница по курсору для domain.
+
+Запуск из каталога lab4:
+    python bench_search.py --users 2000000 --queries 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+
+
+def fill(path: str, users: int, rnd: random.Random) -> list:
+    syllables = [c + v for c in "bcdfghjklmnprstvz" for v in "aeiouy"]
+    first = ["".join(rnd.choices(syllables, k=rnd.randint(2, 3))) for _ in range(500)]
+    last = ["".join(rnd.choices(syllables, k=rnd.randint(2, 4))) for _ in range(2000)]
+    domains = ["gmail.com", "yandex.ru", "mail.ru", "outlook.com"] + [f"{name}.org" for name in last[:300]]
+    rows = []
+    for n in range(1, users + 1):
+        username = f"{rnd.choice(first)}{rnd.choice(['', '.', '_'])}{rnd.choice(last)}{n}"
+        rows.append((username, f"{username}@{rnd.choice(domains)}", 20 + n % 50, "x"))
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users (username, email, age, hashed_password) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_search_"))
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from database import Base, engine
+    from routers.users import router
+    from user_search import backfill
+
+    Base.metadata.create_all(bind=engine)
+    rnd = random.Random(1)
+    started = time.perf_counter()
+    rows = fill("lab4_users.db", args.users, rnd)
+    print(f"fill {args.users} users: {time.perf_counter() - started:.1f} s")
+
+    # Индекс создается после заполнения - как для существующей БД
+    from user_search import create_search_index
+    create_search_index(engine)
+    started = time.perf_counter()
+    added = backfill(engine)
+    print(f"backfill {added} users: {time.perf_counter() - started:.1f} s, "
+          f"db size {os.path.getsize('lab4_users.db') / 2 ** 20:.0f} MB")
+
+    app = FastAPI()
+    app.include_router(router)
+    samples = [rnd.choice(rows) for _ in range(args.queries)]
+    kinds = {
+        "exact": [username for username, *_ in samples],
+        "prefix": [username[:5] for username, *_ in samples],
+        "substring": [username[3:9] for username, *_ in samples],
+        "domain": ["@" + email.split("@")[1] for _, email, *_ in samples],
+    }
+    print(f"{'query':<10} {'p50 ms':>8} {'p99 ms':>8} {'rows':>6}")
+    with TestClient(app) as client:
+        cursors = []
+        for kind, queries in kinds.items():
+            latencies, found = [], 0
+            for q in queries:
+                started = time.perf_counter()
+                response = client.get("/users/search", params={"q": q, "limit": args.limit})
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+                found += len(response.json())
+                if kind == "domain" and "x-next-cursor" in response.headers:
+                    cursors.append((q, response.headers["x-next-cursor"]))
+            print(f"{kind:<10} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.99):>8.2f} "
+                  f"{found / len(queries):>6.1f}")
+        latencies, found = [], 0
+        for q, cursor in cursors:
+            started = time.perf_counter()
+            response = client.get("/users/search", params={"q": q, "limit": args.limit, "cursor": cursor})
+            latencies.append(time.perf_counter() - started)
+            found += len(response.json())
+        if cursors:
+            print(f"{'page2':<10} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.99):>8.2f} "
+                  f"{found / len(cursors):>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
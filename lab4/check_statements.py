@@ -0,0 +1,91 @@
+"""
+Проверка числа SQL-инструкций на запрос для PUT и DELETE /users/{id}.
+
+Обновление и удаление должны укладываться в одну инструкцию
+(UPDATE ... RETURNING / DELETE ... RETURNING) и в синхронном, и в асинхронном
+роутере - в том числе при 404 и при конфликте username (400). Инструкции
+считаются по событию before_cursor_execute на всех движках; прагмы при
+открытии соединения и COMMIT в счет не входят. Работает на временной БД.
+При расхождении завершается с кодом 1, поэтому годится для CI.
+
+Запуск из каталога lab4:
+    python check_statements.py
+"""
+import os
+import sys
+import tempfile
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+os.environ.setdefault("PASSWORD_SCRYPT_N", "16")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+# Относительный путь к БД (./lab4_users.db) - во временном каталоге
+os.chdir(tempfile.mkdtemp(prefix="check_statements_"))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import database  # noqa: E402
+import database_async  # noqa: E402
+from routers import users, users_async  # noqa: E402
+from user_search import create_search_index  # noqa: E402
+
+statements = []
+for engine in (database.engine, database.read_engine,
+               database_async.async_engine.sync_engine, database_async.async_read_engine.sync_engine):
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *_: statements.append(statement))
+
+
+def check(client: TestClient, mode: str) -> int:
+    """Прогоняет сценарии и возвращает число несовпадений"""
+    ids = []
+    for name in ("first", "second"):
+        response = client.post("/users/", json={"username": f"{mode}_{name}", "email": f"{mode}_{name}@example.com",
+                                                "password": "password"})
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    first, second = ids
+    missing = second + 1000
+
+    cases = [
+        ("PUT age", "PUT", f"/users/{first}", {"age": 33}, 200),
+        ("PUT username", "PUT", f"/users/{first}", {"username": f"{mode}_renamed"}, 200),
+        ("PUT password", "PUT", f"/users/{first}", {"password": "new_password"}, 200),
+        ("PUT duplicate", "PUT", f"/users/{first}", {"username": f"{mode}_second"}, 400),
+        ("PUT missing", "PUT", f"/users/{missing}", {"age": 33}, 404),
+        ("DELETE", "DELETE", f"/users/{second}", None, 204),
+        ("DELETE missing", "DELETE", f"/users/{second}", None, 404),
+    ]
+    failures = 0
+    for name, method, url, body, expected_status in cases:
+        statements.clear()
+        response = client.request(method, url, json=body)
+        ok = response.status_code == expected_status and len(statements) == 1
+        failures += not ok
+        print(f"{mode:<6} {name:<16} {response.status_code:>4} {len(statements):>3} {'ok' if ok else 'FAIL'}")
+        if not ok:
+            for statement in statements:
+                print("       ", " ".join(statement.split()))
+    return failures
+
+
+def main() -> int:
+    database.Base.metadata.create_all(bind=database.engine)
+    # Триггеры поиска выполняются внутри той же инструкции и в счет не входят
+    create_search_index(database.engine)
+    print(f"{'mode':<6} {'request':<16} {'code':>4} {'sql':>3}")
+    failures = 0
+    for mode, router in (("sync", users.router), ("async", users_async.router)):
+        app = FastAPI()
+        app.include_router(router)
+        with TestClient(app) as client:
+            failures += check(client, mode)
+            if mode == "async":
+                client.portal.call(database_async.dispose_engines)
+    database.db_writer.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,145 @@
-from sqlalchemy import create_engine
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 # Используем SQLite
 SQLALCHEMY_DATABASE_URL = "sqlite:///./lab4_users.db"
 
-# Создаем движок базы данных
+# sync - синхронные эндпоинты и сессии, async - AsyncSession на aiosqlite (database_async.py)
+DB_MODE = os.getenv("DB_MODE", "sync")
+# Соединений для чтения (читатели в режиме WAL не мешают друг другу и писателю)
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(2 * (os.cpu_count() or 1))))
+# Сколько операций записи может ждать писателя, и сколько секунд ждать места в очереди
+DB_WRITE_QUEUE = int(os.getenv("DB_WRITE_QUEUE", "1000"))
+DB_WRITE_QUEUE_TIMEOUT = float(os.getenv("DB_WRITE_QUEUE_TIMEOUT", "0.5"))
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # в режиме WAL данные не теряются при падении процесса
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-65536",   # 64 МБ страничного кэша на соединение
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+def set_sqlite_pragmas(dbapi_connection, query_only: bool) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    if query_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+# Создаем движок базы данных (запись; им же создаются таблицы)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False}
 )
+event.listen(engine, "connect", lambda conn, _: set_sqlite_pragmas(conn, query_only=False))
 
-# Создаем фабрику сессий
+# Отдельный пул соединений только для чтения
+read_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=0
+)
+event.listen(read_engine, "connect", lambda conn, _: set_sqlite_pragmas(conn, query_only=True))
+
+# Создаем фабрики сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Базовый класс для моделей
 Base = declarative_base()
 
+T = TypeVar("T")
+
+
+class WriteQueueFullError(Exception):
+    """Очередь записи заполнена"""
+
+
+class DatabaseWriter:
+    """
+    Единственный писатель: все изменения БД выполняются по очереди в одном
+    потоке со своей сессией, поэтому записи не конкурируют за блокировку файла.
+    Очередь ограничена: если место не освобождается за queue_timeout секунд,
+    бросается WriteQueueFullError (-> 503).
+    """
+
+    def __init__(self, queue_size: int = DB_WRITE_QUEUE, queue_timeout: float = DB_WRITE_QUEUE_TIMEOUT):
+        self.queue_timeout = queue_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def run(self, write: Callable[[Session], T]) -> T:
+        """Выполняет write(session) в потоке писателя и возвращает результат (или бросает его исключение)"""
+        self.start()
+        future: Future = Future()
+        try:
+            self._queue.put((write, future), timeout=self.queue_timeout)
+        except queue.Full:
+            self.rejected += 1
+            raise WriteQueueFullError("База данных перегружена записью, повторите запрос позже")
+        return future.result()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def _loop(self) -> None:
+        db = SessionLocal()
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                write, future = job
+                try:
+                    future.set_result(write(db))
+                except BaseException as e:  # noqa: BLE001 - исключение уходит вызывающему
+                    db.rollback()
+                    future.set_exception(e)
+                finally:
+                    # Объекты одной операции не должны попадать в следующую
+                    db.expunge_all()
+                self.completed += 1
+        finally:
+            db.close()
+
+
+db_writer = DatabaseWriter()
+
+
 # Dependency для получения сессии БД
 def get_db():
     """Генератор для получения сессии базы данных"""
@@ -24,4 +147,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    """Сессия для эндпоинтов, которые только читают"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,66 @@
+"""
+Асинхронный вариант database.py: драйвер aiosqlite и AsyncSession.
+
+Устройство то же, что и у синхронного слоя:
+- все соединения открываются в режиме WAL с теми же прагмами;
+- читатели получают отдельный пул соединений только для чтения;
+- писатель один: у движка записи ровно одно соединение, поэтому записи
+  выполняются по очереди. Кто не дождался соединения за
+  DB_WRITE_QUEUE_TIMEOUT секунд, получает WriteQueueFullError (-> 503).
+Таблицы по-прежнему создает синхронный движок при старте приложения.
+"""
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database import DB_READ_POOL_SIZE, DB_WRITE_QUEUE_TIMEOUT, WriteQueueFullError, set_sqlite_pragmas
+
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./lab4_users.db"
+
+# Движок записи: одно соединение - один писатель
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=DB_WRITE_QUEUE_TIMEOUT
+)
+event.listen(async_engine.sync_engine, "connect", lambda conn, _: set_sqlite_pragmas(conn, query_only=False))
+
+# Пул соединений только для чтения
+async_read_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=0
+)
+event.listen(async_read_engine.sync_engine, "connect", lambda conn, _: set_sqlite_pragmas(conn, query_only=True))
+
+# expire_on_commit=False: после commit атрибуты доступны без нового запроса к БД
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+T = TypeVar("T")
+
+
+async def run_write(write: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """Выполняет await write(session) на соединении записи (аналог DatabaseWriter.run)"""
+    try:
+        async with AsyncSessionLocal() as db:
+            return await write(db)
+    except PoolTimeoutError:
+        raise WriteQueueFullError("База данных перегружена записью, повторите запрос позже")
+
+
+async def get_async_read_db():
+    """Асинхронная сессия для эндпоинтов, которые только читают"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def dispose_engines() -> None:
+    await async_engine.dispose()
+    await async_read_engine.dispose()
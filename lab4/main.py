@@ -1,8 +1,17 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
-from database import engine, Base
-from routers.users import router
+from database import DB_MODE, engine, Base, db_writer
+from passwords import failed_attempts, password_hasher
+from user_cache import user_cache
+from user_search import create_search_index
+
+# Синхронные или асинхронные эндпоинты - по DB_MODE
+if DB_MODE == "async":
+    from database_async import dispose_engines
+    from routers.users_async import router
+else:
+    from routers.users import router
 
 
 # Создаем таблицы при запуске приложения
@@ -11,9 +20,18 @@ async def lifespan(app: FastAPI):
     """Lifecycle событие для создания таблиц при старте"""
     # Startup
     Base.metadata.create_all(bind=engine)
+    create_search_index(engine)
     print("База данных инициализирована")
+    password_hasher.start()
+    if DB_MODE != "async":
+        db_writer.start()
     yield
     # Shutdown
+    if DB_MODE == "async":
+        await dispose_engines()
+    else:
+        db_writer.close()
+    password_hasher.close()
     print("Приложение завершает работу")
 
 
@@ -35,5 +53,16 @@ def read_root():
     return {
         "message": "Лабораторная работа 4: REST API с базой данных",
         "docs": "Перейдите на /docs для просмотра Swagger UI",
-        "database": "SQLite (lab4_users.db)"
+        "database": "SQLite (lab4_users.db)",
+        "db_mode": DB_MODE
     }
+
+
+@app.get("/stats", tags=["root"])
+def read_stats():
+    """Счетчики сервиса хеширования паролей, кэша пользователей и очереди записи"""
+    stats = {"passwords": password_hasher.stats(), "failed_password_checks": failed_attempts.stats(),
+             "user_cache": user_cache.stats()}
+    if DB_MODE != "async":
+        stats["db_writer"] = db_writer.stats()
+    return stats
@@ -0,0 +1,237 @@
+"""
+Хеширование паролей: scrypt с солью в пуле процессов.
+
+Формат хеша: scrypt$<n>$<r>$<p>$<соль base64>$<хеш base64> - параметры
+стоимости хранятся вместе с хешем, поэтому их можно менять без миграции:
+старые хеши проверяются со своими параметрами и при успешном входе
+пересчитываются с текущими. Так же пересчитываются старые хеши SHA-256 без соли.
+
+KDF считается в ProcessPoolExecutor размером с число ядер, чтобы не занимать
+GIL и пул потоков FastAPI. Число одновременно ожидающих хеширования запросов
+ограничено: если очередь заполнена и место не освобождается за
+PASSWORD_HASH_QUEUE_TIMEOUT секунд, бросается HashingBusyError (-> 503).
+
+Неудачные проверки пароля считаются по пользователю (FailedAttempts):
+после PASSWORD_VERIFY_MAX_FAILURES за PASSWORD_VERIFY_WINDOW секунд
+проверки этого пользователя отклоняются до конца окна (-> 429).
+"""
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+# Параметры стоимости scrypt: n - степень двойки (память ~ 128 * n * r байт)
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", "16384"))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+# Процессов в пуле (0 - хешировать в потоке запроса)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Сколько хеширований может ждать своей очереди, и сколько секунд ждать места в ней
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", str(4 * max(1, PASSWORD_HASH_WORKERS))))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "0.5"))
+# Сколько неудачных проверок пароля одного пользователя допускается за окно (секунды)
+PASSWORD_VERIFY_MAX_FAILURES = int(os.getenv("PASSWORD_VERIFY_MAX_FAILURES", "5"))
+PASSWORD_VERIFY_WINDOW = float(os.getenv("PASSWORD_VERIFY_WINDOW", "60"))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+# Паролей в одной задаче пула при пакетном хешировании
+HASH_BATCH_SIZE = 16
+
+
+class HashingBusyError(Exception):
+    """Очередь хеширования заполнена"""
+
+
+def scrypt_hash(password: str, n: int, r: int, p: int) -> str:
+    salt = os.urandom(SALT_BYTES)
+    key = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=KEY_BYTES)
+    return "$".join(("scrypt", str(n), str(r), str(p),
+                     base64.b64encode(salt).decode(), base64.b64encode(key).decode()))
+
+
+def scrypt_hash_many(passwords: List[str], n: int, r: int, p: int) -> List[str]:
+    return [scrypt_hash(password, n, r, p) for password in passwords]
+
+
+def scrypt_verify(password: str, hashed: str) -> bool:
+    """Поврежденный или незнакомый формат хеша - просто неверный пароль"""
+    try:
+        _, n, r, p, salt, key = hashed.split("$")
+        n, r, p = int(n), int(r), int(p)
+        expected = base64.b64decode(key, validate=True)
+        actual = hashlib.scrypt(password.encode(), salt=base64.b64decode(salt, validate=True), n=n, r=r, p=p,
+                                maxmem=256 * n * r * p, dklen=len(expected))
+    except (ValueError, TypeError, OverflowError):
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def is_legacy_hash(hashed: str) -> bool:
+    """Старый формат: SHA-256 без соли, 64 hex-символа"""
+    return len(hashed) == 64 and not hashed.startswith("scrypt$")
+
+
+class FailedAttempts:
+    """
+    Неудачные проверки пароля по пользователю в скользящем окне.
+    Попытка засчитывается до проверки (одновременные запросы тоже считаются),
+    успешная проверка сбрасывает счетчик пользователя.
+    """
+
+    def __init__(self, max_failures: int = PASSWORD_VERIFY_MAX_FAILURES, window: float = PASSWORD_VERIFY_WINDOW):
+        self.max_failures = max_failures
+        self.window = window
+        self._failures: Dict[int, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self.blocked = 0
+
+    def start(self, user_id: int) -> float:
+        """Засчитывает попытку; если лимит исчерпан - через сколько секунд можно повторить (иначе 0)"""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.setdefault(user_id, deque(maxlen=self.max_failures))
+            while failures and failures[0] <= now - self.window:
+                failures.popleft()
+            if len(failures) >= self.max_failures:
+                self.blocked += 1
+                return failures[0] + self.window - now
+            failures.append(now)
+            return 0.0
+
+    def succeeded(self, user_id: int) -> None:
+        with self._lock:
+            self._failures.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "max_failures": self.max_failures,
+            "window": self.window,
+            "users": len(self._failures),
+            "blocked": self.blocked,
+        }
+
+
+class PasswordHasher:
+    """Хеширование и проверка паролей в ограниченном пуле процессов"""
+
+    def __init__(self, n: int = PASSWORD_SCRYPT_N, r: int = PASSWORD_SCRYPT_R, p: int = PASSWORD_SCRYPT_P,
+                 workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE,
+                 queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT):
+        self.n, self.r, self.p = n, r, p
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self.queue_size = queue_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """Поднимает процессы заранее, чтобы первые запросы не ждали их запуска"""
+        pool = self._get_pool()
+        if pool is not None:
+            for future in [pool.submit(int) for _ in range(self.workers)]:
+                future.result()
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def hash(self, password: str) -> str:
+        hashed = self._run(scrypt_hash, password, self.n, self.r, self.p)
+        self.hashed += 1
+        return hashed
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """Хеширует пакет паролей параллельно на всех процессах пула; занимает одно место в очереди"""
+        with self._slot():
+            pool = self._get_pool()
+            if pool is None:
+                hashed = scrypt_hash_many(passwords, self.n, self.r, self.p)
+            else:
+                # Не больше workers задач в очереди пула одновременно: одиночные
+                # регистрации встают между порциями импорта, а не за всем импортом
+                hashed, window = [], deque()
+                for i in range(0, len(passwords), HASH_BATCH_SIZE):
+                    if len(window) >= self.workers:
+                        hashed += window.popleft().result()
+                    window.append(pool.submit(scrypt_hash_many, passwords[i:i + HASH_BATCH_SIZE],
+                                              self.n, self.r, self.p))
+                for future in window:
+                    hashed += future.result()
+        self.hashed += len(hashed)
+        return hashed
+
+    def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Проверяет пароль. Вторым значением возвращает новый хеш, если пароль верный,
+        а сохраненный хеш устарел (SHA-256 или другие параметры scrypt) - его нужно записать в БД.
+        """
+        self.verified += 1
+        if is_legacy_hash(hashed):
+            # SHA-256 дешевый - его проверяем прямо здесь
+            valid = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed)
+        else:
+            valid = self._run(scrypt_verify, password, hashed)
+        if not valid or not self.needs_rehash(hashed):
+            return valid, None
+        self.rehashed += 1
+        return True, self.hash(password)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return is_legacy_hash(hashed) or hashed.split("$")[1:4] != [str(self.n), str(self.r), str(self.p)]
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "scrypt": {"n": self.n, "r": self.r, "p": self.p},
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed,
+            "rejected": self.rejected,
+        }
+
+    def _run(self, func, *args):
+        with self._slot():
+            pool = self._get_pool()
+            if pool is None:
+                return func(*args)
+            future: Future = pool.submit(func, *args)
+            return future.result()
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise HashingBusyError("Сервис хеширования паролей перегружен, повторите запрос позже")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: не копируем через fork процесс с потоками сервера
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+
+password_hasher = PasswordHasher()
+failed_attempts = FailedAttempts()
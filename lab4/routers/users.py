@@ -1,12 +1,30 @@
-from fastapi import APIRouter, HTTPException, Path, Depends, status
+from fastapi import APIRouter, HTTPException, Path, Depends, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List
-import hashlib
+from typing import AsyncIterator, Dict, List, Literal, Optional, Set, Tuple
+import asyncio
+import base64
+import binascii
+import codecs
+import csv
+import json
+import math
+import os
+import time
 
-from database import get_db
+from database import ReadSessionLocal, WriteQueueFullError, db_writer, get_read_db
 from models import User as UserModel
-from schemas import User, UserCreate, UserUpdate
+from passwords import HashingBusyError, failed_attempts, password_hasher
+from schemas import (
+    BulkImportResult, BulkRowError, PasswordCheck, PasswordCheckResult, User, UserCreate, UserUpdate
+)
+from user_cache import user_cache
+from user_search import SEARCH_MIN_LENGTH, SEARCH_TIERS, collect_page, is_search_key, search_queries
 
 router = APIRouter(
     prefix="/users",
@@ -16,26 +34,248 @@ router = APIRouter(
 
 
 def hash_password(password: str) -> str:
-    """Простое хеширование пароля """
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Хеширование пароля (scrypt с солью) в пуле процессов"""
+    try:
+        return password_hasher.hash(password)
+    except HashingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+
+
+def start_password_check(user_id: int) -> None:
+    """Засчитывает проверку пароля; после серии неудачных - 429 до конца окна"""
+    retry_after = failed_attempts.start(user_id)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много неудачных проверок пароля, повторите позже",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+
+def write(operation):
+    """Выполняет operation(session) в потоке-писателе; переполненная очередь записи - 503"""
+    try:
+        return db_writer.run(operation)
+    except WriteQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+
+
+EXPORT_CHUNK_SIZE = 1000
+# Строк импорта на одну транзакцию (и одну порцию хеширования паролей)
+USERS_BULK_CHUNK_SIZE = int(os.getenv("USERS_BULK_CHUNK_SIZE", "500"))
+
+
+def cache_user(key: tuple, user: Optional[UserModel], generation: int) -> Optional[bytes]:
+    """Сериализует загруженного из БД пользователя и кладет в кэш под обоими ключами (id и username)"""
+    if not user:
+        user_cache.put((key,), None, generation)
+        return None
+    body = User.model_validate(user).model_dump_json().encode()
+    user_cache.put((("id", user.id), ("username", user.username)), body, generation, user.id)
+    return body
+
+
+def user_response(body: Optional[bytes], not_found_detail: str) -> Response:
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=not_found_detail
+        )
+    return Response(content=body, media_type="application/json")
+
+
+USER_COLUMNS = (UserModel.id, UserModel.username, UserModel.email, UserModel.age)
+
+
+def update_statement(user_id: int, values: dict):
+    """
+    Одна инструкция UPDATE ... RETURNING: ответ строится из возвращенной строки,
+    без SELECT до и refresh после. Без полей для изменения - просто SELECT.
+    """
+    if not values:
+        return select(*USER_COLUMNS).where(UserModel.id == user_id)
+    return (
+        update(UserModel).where(UserModel.id == user_id).values(**values)
+        .returning(*USER_COLUMNS).execution_options(synchronize_session=False)
+    )
+
+
+def delete_statement(user_id: int):
+    """DELETE ... RETURNING username (он нужен для сброса кэша)"""
+    return (
+        delete(UserModel).where(UserModel.id == user_id)
+        .returning(UserModel.username).execution_options(synchronize_session=False)
+    )
+
+
+def cached_user_response(key: tuple, load, not_found_detail: str) -> Response:
+    """
+    Ответ из кэша пользователей; при промахе - load() из БД, сериализация
+    и сохранение под обоими ключами (id и username).
+    """
+    found, body = user_cache.get(key)
+    if not found:
+        generation = user_cache.generation()
+        body = cache_user(key, load(), generation)
+    return user_response(body, not_found_detail)
+
+
+def encode_cursor(order_by: str, value) -> str:
+    """Непрозрачный курсор: сортировка и ключ последней записи страницы"""
+    return base64.urlsafe_b64encode(json.dumps([order_by, value]).encode()).decode()
+
+
+def decode_cursor(cursor: str, order_by: str):
+    try:
+        cursor_order, value = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+    if cursor_order != order_by:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Курсор получен для другой сортировки"
+        )
+    return value
+
+
+def page_statement(skip: int, limit: int, cursor: Optional[str], order_by: str):
+    column = UserModel.username if order_by == "username" else UserModel.id
+    statement = select(UserModel).order_by(column)
+    if cursor is not None:
+        value = decode_cursor(cursor, order_by)
+        # Ключ другого типа дал бы 500 от драйвера или молча пустую страницу
+        valid = isinstance(value, str) if order_by == "username" \
+            else isinstance(value, int) and not isinstance(value, bool)
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Некорректный курсор"
+            )
+        statement = statement.where(column > value)
+    elif skip:
+        statement = statement.offset(skip)
+    return statement.limit(limit)
+
+
+def set_next_cursor(response: Response, users, limit: int, order_by: str) -> None:
+    """Полная страница - в X-Next-Cursor курсор следующей"""
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(order_by, getattr(users[-1], order_by))
 
 
 @router.get(
     "/",
     response_model=List[User],
     summary="Получить список всех пользователей",
-    description="Возвращает список всех пользователей из базы данных"
+    description="Возвращает страницу пользователей; курсор следующей страницы - в заголовке X-Next-Cursor"
 )
 def list_users(
+        response: Response,
         skip: int = 0,
-        limit: int = 100,
-        db: Session = Depends(get_db)
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor предыдущей страницы"),
+        order_by: Literal["id", "username"] = "id",
+        db: Session = Depends(get_read_db)
 ):
-    """Получить список всех пользователей с пагинацией"""
-    users = db.query(UserModel).offset(skip).limit(limit).all()
+    """
+    Получить список пользователей с пагинацией.
+    С курсором страница ищется по индексу (WHERE ключ > последний ключ), поэтому
+    далекие страницы стоят столько же, сколько первая; skip оставлен для совместимости.
+    """
+    users = db.scalars(page_statement(skip, limit, cursor, order_by)).all()
+    set_next_cursor(response, users, limit, order_by)
     return users
 
 
+EXPORT_STATEMENT = select(UserModel.id, UserModel.username, UserModel.email, UserModel.age).order_by(UserModel.id)
+
+
+def export_lines(partition) -> str:
+    """Порция строк (id, username, email, age) в NDJSON"""
+    return "".join(
+        json.dumps({"username": username, "email": email, "age": age, "id": user_id}, ensure_ascii=False) + "\n"
+        for user_id, username, email, age in partition
+    )
+
+
+@router.get(
+    "/export",
+    summary="Выгрузить всех пользователей",
+    description="Потоковая выгрузка всей таблицы в NDJSON, по одному пользователю на строку"
+)
+def export_users():
+    """Выгрузка пользователей порциями по EXPORT_CHUNK_SIZE строк, без загрузки всей таблицы в память"""
+
+    def chunks():
+        # Своя сессия: ответ отдается уже после выхода из обработчика
+        db = ReadSessionLocal()
+        try:
+            rows = db.execute(EXPORT_STATEMENT, execution_options={"yield_per": EXPORT_CHUNK_SIZE})
+            for partition in rows.partitions():
+                yield export_lines(partition)
+        finally:
+            db.close()
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+def decode_search_cursor(cursor: Optional[str], q: str) -> Optional[Tuple[int, object]]:
+    """Позиция (уровень, ключ) из курсора поиска; курсор привязан к строке запроса"""
+    if cursor is None:
+        return None
+    position = decode_cursor(cursor, f"search:{q}")
+    if not (isinstance(position, list) and len(position) == 2 and position[0] in range(len(SEARCH_TIERS))
+            and is_search_key(position[0], position[1])):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+    return position[0], position[1]
+
+
+def set_search_cursor(response: Response, q: str, position: Optional[Tuple[int, object]]) -> None:
+    if position is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(f"search:{q}", list(position))
+
+
+@router.get(
+    "/search",
+    response_model=List[User],
+    summary="Поиск пользователей по подстроке",
+    description="Поиск по подстроке username и email (от 3 символов, без учета регистра); "
+                "сначала полные совпадения, затем username с этим началом, затем остальные. "
+                "Курсор следующей страницы - в заголовке X-Next-Cursor"
+)
+def search_users(
+        response: Response,
+        q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100, description="Подстрока username или email"),
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor предыдущей страницы"),
+        db: Session = Depends(get_read_db)
+):
+    """Поиск по индексу FTS5 trigram (см. user_search.py)"""
+    page: list = []
+    position = None
+    for tier, statement, params in search_queries(q, decode_search_cursor(cursor, q)):
+        rows = db.execute(statement, {**params, "limit": limit - len(page)}).all()
+        position = collect_page(rows, tier, page, limit)
+        if position is not None:
+            break
+    set_search_cursor(response, q, position)
+    return [User.model_validate(row) for row in page]
+
+
 @router.get(
     "/{user_id}",
     response_model=User,
@@ -44,16 +284,14 @@ def list_users(
 )
 def get_user(
         user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)"),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """Получить конкретного пользователя по ID"""
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Пользователь с ID {user_id} не найден"
-        )
-    return user
+    return cached_user_response(
+        ("id", user_id),
+        lambda: db.query(UserModel).filter(UserModel.id == user_id).first(),
+        f"Пользователь с ID {user_id} не найден"
+    )
 
 
 @router.post(
@@ -63,33 +301,215 @@ def get_user(
     summary="Создать нового пользователя",
     description="Создает нового пользователя в базе данных"
 )
-def create_user(
-        user_in: UserCreate,
-        db: Session = Depends(get_db)
-):
+def create_user(user_in: UserCreate):
     """Создать нового пользователя"""
-    # Хешируем пароль
+    # Хешируем пароль (до очереди записи, чтобы не задерживать писателя)
     hashed_password = hash_password(user_in.password)
 
-    # Создаем объект пользователя
-    db_user = UserModel(
-        username=user_in.username,
-        email=user_in.email,
-        age=user_in.age,
-        hashed_password=hashed_password
-    )
-
-    try:
+    def insert(db: Session) -> User:
+        # Создаем объект пользователя
+        db_user = UserModel(
+            username=user_in.username,
+            email=user_in.email,
+            age=user_in.age,
+            hashed_password=hashed_password
+        )
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
-        return db_user
+        return User.model_validate(db_user)
+
+    try:
+        user = write(insert)
     except IntegrityError:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Пользователь с таким username или email уже существует"
         )
+    # Мог быть закэширован 404 для этого id или username
+    user_cache.invalidate(("id", user.id), ("username", user.username))
+    return user
+
+
+async def read_lines(request: Request) -> AsyncIterator[str]:
+    """Строки тела запроса по мере его получения"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tail = ""
+    async for chunk in request.stream():
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def read_records(request: Request, is_csv: bool) -> AsyncIterator[Tuple[int, object]]:
+    """(номер строки данных, запись) для CSV с заголовком или NDJSON; нераспознанная строка - None"""
+    header = None
+    row = 0
+    async for line in read_lines(request):
+        if not line.strip():
+            continue
+        if is_csv:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            record = dict(zip(header, values))
+            if record.get("age") == "":
+                record["age"] = None
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+        row += 1
+        yield row, record
+
+
+def conflicts_statement(rows: List[Tuple[int, UserCreate]]):
+    """Запрос username и email из БД, совпадающих с username или email строк порции"""
+    return select(UserModel.username, UserModel.email).where(or_(
+        UserModel.username.in_([user.username for _, user in rows]),
+        UserModel.email.in_([user.email for _, user in rows])
+    ))
+
+
+def match_conflicts(rows: List[Tuple[int, UserCreate]], existing) -> Dict[int, str]:
+    """Номер строки -> причина для строк, чьи username или email есть среди existing"""
+    usernames = {username for username, _ in existing}
+    emails = {email for _, email in existing}
+    conflicts = {}
+    for row, user in rows:
+        if user.username in usernames:
+            conflicts[row] = "duplicate_username"
+        elif user.email in emails:
+            conflicts[row] = "duplicate_email"
+    return conflicts
+
+
+def find_conflicts(db: Session, rows: List[Tuple[int, UserCreate]]) -> Dict[int, str]:
+    """Строки, чьи username или email уже есть в БД: номер строки -> причина"""
+    if not rows:
+        return {}
+    return match_conflicts(rows, db.execute(conflicts_statement(rows)).all())
+
+
+def insert_statement(rows: List[Tuple[int, UserCreate]], hashed: List[str]):
+    """INSERT ... ON CONFLICT DO NOTHING RETURNING username для порции импорта"""
+    return sqlite_insert(UserModel).values([
+        {"username": user.username, "email": user.email, "age": user.age, "hashed_password": password}
+        for (_, user), password in zip(rows, hashed)
+    ]).on_conflict_do_nothing().returning(UserModel.username)
+
+
+def insert_chunk(rows: List[Tuple[int, UserCreate]], hashed: List[str]) -> Set[int]:
+    """Одна транзакция на порцию; номера добавленных строк"""
+    if not rows:
+        return set()
+    statement = insert_statement(rows, hashed)
+
+    def insert(db: Session) -> Set[str]:
+        inserted = set(db.scalars(statement).all())
+        db.commit()
+        return inserted
+
+    while True:
+        try:
+            inserted_usernames = db_writer.run(insert)
+            break
+        except WriteQueueFullError:
+            # Импорт не прерываем - ждем, пока очередь записи освободится
+            time.sleep(0.1)
+    return {row for row, user in rows if user.username in inserted_usernames}
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Пакетное хеширование; при заполненной очереди импорт ждет, а не падает с 503"""
+    while True:
+        try:
+            return await run_in_threadpool(password_hasher.hash_many, passwords)
+        except HashingBusyError:
+            await asyncio.sleep(0.1)
+
+
+async def run_import(request: Request, find_conflicts, insert_chunk) -> BulkImportResult:
+    """
+    Пакетный импорт: строки читаются из потока и обрабатываются порциями по
+    USERS_BULK_CHUNK_SIZE - валидация UserCreate, проверка дубликатов одним
+    запросом, параллельное хеширование паролей и одна транзакция на порцию.
+    Невалидные строки и дубликаты возвращаются с номерами, остальные добавляются.
+    find_conflicts(rows) и insert_chunk(rows, hashed) - корутины работы с БД.
+    """
+    is_csv = request.headers.get("content-type", "").startswith("text/csv")
+    errors: List[BulkRowError] = []
+    inserted = 0
+    # username и email, занятые строками этого же импорта
+    seen_usernames: Set[str] = set()
+    seen_emails: Set[str] = set()
+
+    async def flush(chunk: List[Tuple[int, UserCreate]]) -> int:
+        conflicts = await find_conflicts(chunk)
+        rows = [(row, user) for row, user in chunk if row not in conflicts]
+        hashed = await hash_passwords([user.password for _, user in rows])
+        added = await insert_chunk(rows, hashed)
+        if added:
+            user_cache.drop_negative()
+        # Что не вставилось из-за параллельной записи - тоже дубликаты
+        conflicts.update(await find_conflicts([(row, user) for row, user in rows if row not in added]))
+        for row, user in chunk:
+            if row in conflicts:
+                errors.append(BulkRowError(row=row, reason=conflicts[row]))
+                seen_usernames.discard(user.username)
+                seen_emails.discard(user.email)
+        return len(added)
+
+    chunk: List[Tuple[int, UserCreate]] = []
+    async for row, record in read_records(request, is_csv):
+        try:
+            user = UserCreate.model_validate(record)
+        except ValidationError as e:
+            errors.append(BulkRowError(row=row, reason="invalid", errors=[
+                {"loc": list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+                for error in e.errors(include_url=False, include_input=False)
+            ]))
+            continue
+        if user.username in seen_usernames:
+            errors.append(BulkRowError(row=row, reason="duplicate_username"))
+            continue
+        if user.email in seen_emails:
+            errors.append(BulkRowError(row=row, reason="duplicate_email"))
+            continue
+        seen_usernames.add(user.username)
+        seen_emails.add(user.email)
+        chunk.append((row, user))
+        if len(chunk) >= USERS_BULK_CHUNK_SIZE:
+            inserted += await flush(chunk)
+            chunk = []
+    inserted += await flush(chunk)
+
+    errors.sort(key=lambda error: error.row)
+    return BulkImportResult(inserted=inserted, failed=len(errors), errors=errors)
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkImportResult,
+    summary="Импорт пользователей",
+    description="Принимает CSV (text/csv, с заголовком username,email,password,age) или NDJSON потоком"
+)
+async def import_users(
+        request: Request,
+        db: Session = Depends(get_read_db)
+):
+    """Пакетный импорт пользователей (см. run_import)"""
+    return await run_import(
+        request,
+        lambda rows: run_in_threadpool(find_conflicts, db, rows),
+        lambda rows, hashed: run_in_threadpool(insert_chunk, rows, hashed)
+    )
 
 
 @router.put(
@@ -100,37 +520,35 @@ def create_user(
 )
 def update_user(
         user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)"),
-        user_in: UserUpdate = ...,
-        db: Session = Depends(get_db)
+        user_in: UserUpdate = ...
 ):
     """Обновить данные пользователя"""
-    # Находим пользователя
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Пользователь с ID {user_id} не найден"
-        )
-
     # Обновляем поля, если они переданы
     update_data = user_in.dict(exclude_unset=True)
 
     if "password" in update_data:
         update_data["hashed_password"] = hash_password(update_data.pop("password"))
 
-    for field, value in update_data.items():
-        setattr(user, field, value)
+    def update_row(db: Session) -> Optional[User]:
+        row = db.execute(update_statement(user_id, update_data)).first()
+        db.commit()
+        return None if row is None else User.model_validate(row)
 
     try:
-        db.commit()
-        db.refresh(user)
-        return user
+        user = write(update_row)
     except IntegrityError:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Пользователь с таким username или email уже существует"
         )
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Пользователь с ID {user_id} не найден"
+        )
+    # Старый username кэш помнит сам; новый мог быть закэширован как 404
+    user_cache.invalidate_user(user_id, ("username", user.username))
+    return user
 
 
 @router.delete(
@@ -140,10 +558,39 @@ def update_user(
     description="Удаляет пользователя из базы данных"
 )
 def delete_user(
-        user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)"),
-        db: Session = Depends(get_db)
+        user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)")
 ):
     """Удалить пользователя по ID"""
+
+    def delete_row(db: Session) -> Optional[str]:
+        username = db.execute(delete_statement(user_id)).scalar_one_or_none()
+        db.commit()
+        return username
+
+    username = write(delete_row)
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Пользователь с ID {user_id} не найден"
+        )
+    user_cache.invalidate_user(user_id, ("username", username))
+    return None
+
+
+@router.post(
+    "/{user_id}/verify-password",
+    response_model=PasswordCheckResult,
+    summary="Проверить пароль пользователя",
+    description="Проверяет пароль; устаревший хеш (SHA-256 или старые параметры scrypt) при этом пересчитывается. "
+                "Внутренний эндпоинт для сервиса входа, без аутентификации - наружу не публиковать. "
+                "После PASSWORD_VERIFY_MAX_FAILURES неудачных проверок за PASSWORD_VERIFY_WINDOW секунд - 429"
+)
+def verify_password(
+        user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)"),
+        check: PasswordCheck = ...,
+        db: Session = Depends(get_read_db)
+):
+    """Проверить пароль пользователя"""
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -151,9 +598,25 @@ def delete_user(
             detail=f"Пользователь с ID {user_id} не найден"
         )
 
-    db.delete(user)
-    db.commit()
-    return None
+    start_password_check(user_id)
+    try:
+        valid, new_hash = password_hasher.verify(check.password, user.hashed_password)
+    except HashingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    if valid:
+        failed_attempts.succeeded(user_id)
+
+    if new_hash is not None:
+        def rehash(write_db: Session) -> None:
+            write_db.query(UserModel).filter(UserModel.id == user_id).update({"hashed_password": new_hash})
+            write_db.commit()
+
+        write(rehash)
+    return PasswordCheckResult(valid=valid)
 
 
 @router.get(
@@ -164,13 +627,11 @@ def delete_user(
 )
 def search_by_username(
         username: str = Path(..., min_length=3, max_length=50),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """Поиск пользователя по username"""
-    user = db.query(UserModel).filter(UserModel.username == username).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Пользователь с username '{username}' не найден"
-        )
-    return user
\ No newline at end of file
+    return cached_user_response(
+        ("username", username),
+        lambda: db.query(UserModel).filter(UserModel.username == username).first(),
+        f"Пользователь с username '{username}' не найден"
+    )
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""
+Асинхронные версии эндпоинтов routers/users.py (DB_MODE=async).
+
+Запросы к БД идут через AsyncSession, поэтому ожидающий БД запрос не занимает
+поток из пула FastAPI. Пути, схемы, коды ответов и кэш те же, что у
+синхронного роутера; общие функции берутся из него. В пул потоков уходит
+только ожидание хеширования паролей.
+"""
+from fastapi import APIRouter, HTTPException, Path, Depends, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update as sql_update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Literal, Optional, Set, Tuple
+import asyncio
+
+from database import WriteQueueFullError
+from database_async import AsyncReadSessionLocal, get_async_read_db, run_write
+from models import User as UserModel
+from passwords import HashingBusyError, failed_attempts, password_hasher
+from routers.users import (
+    EXPORT_CHUNK_SIZE, EXPORT_STATEMENT, cache_user, conflicts_statement, decode_search_cursor, delete_statement,
+    export_lines, hash_password, insert_statement, match_conflicts, page_statement, run_import, set_next_cursor,
+    set_search_cursor, start_password_check, update_statement, user_response
+)
+from schemas import BulkImportResult, PasswordCheck, PasswordCheckResult, User, UserCreate, UserUpdate
+from user_cache import user_cache
+from user_search import SEARCH_MIN_LENGTH, collect_page, search_queries
+
+router = APIRouter(
+    prefix="/users",
+    tags=["users"],
+    responses={404: {"description": "Пользователь не найден"}}
+)
+
+
+async def write(operation):
+    """Выполняет await operation(session) на соединении записи; занятое дольше таймаута - 503"""
+    try:
+        return await run_write(operation)
+    except WriteQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+
+
+async def cached_user_response(key: tuple, load, not_found_detail: str) -> Response:
+    """Как routers.users.cached_user_response, но load - корутина"""
+    found, body = user_cache.get(key)
+    if not found:
+        generation = user_cache.generation()
+        body = cache_user(key, await load(), generation)
+    return user_response(body, not_found_detail)
+
+
+@router.get(
+    "/",
+    response_model=List[User],
+    summary="Получить список всех пользователей",
+    description="Возвращает страницу пользователей; курсор следующей страницы - в заголовке X-Next-Cursor"
+)
+async def list_users(
+        response: Response,
+        skip: int = 0,
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor предыдущей страницы"),
+        order_by: Literal["id", "username"] = "id",
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получить список пользователей с пагинацией"""
+    users = (await db.scalars(page_statement(skip, limit, cursor, order_by))).all()
+    set_next_cursor(response, users, limit, order_by)
+    return users
+
+
+@router.get(
+    "/export",
+    summary="Выгрузить всех пользователей",
+    description="Потоковая выгрузка всей таблицы в NDJSON, по одному пользователю на строку"
+)
+async def export_users():
+    """Выгрузка пользователей порциями по EXPORT_CHUNK_SIZE строк, без загрузки всей таблицы в память"""
+
+    async def chunks():
+        # Своя сессия: ответ отдается уже после выхода из обработчика
+        async with AsyncReadSessionLocal() as db:
+            rows = await db.stream(EXPORT_STATEMENT, execution_options={"yield_per": EXPORT_CHUNK_SIZE})
+            async for partition in rows.partitions():
+                yield export_lines(partition)
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/search",
+    response_model=List[User],
+    summary="Поиск пользователей по подстроке",
+    description="Поиск по подстроке username и email (от 3 символов, без учета регистра); "
+                "сначала полные совпадения, затем username с этим началом, затем остальные. "
+                "Курсор следующей страницы - в заголовке X-Next-Cursor"
+)
+async def search_users(
+        response: Response,
+        q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100, description="Подстрока username или email"),
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor предыдущей страницы"),
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """Поиск по индексу FTS5 trigram (см. user_search.py)"""
+    page: list = []
+    position = None
+    for tier, statement, params in search_queries(q, decode_search_cursor(cursor, q)):
+        rows = (await db.execute(statement, {**params, "limit": limit - len(page)})).all()
+        position = collect_page(rows, tier, page, limit)
+        if position is not None:
+            break
+    set_search_cursor(response, q, position)
+    return [User.model_validate(row) for row in page]
+
+
+@router.get(
+    "/{user_id}",
+    response_model=User,
+    summary="Получить пользователя по ID",
+    description="Возвращает данные конкретного пользователя по его ID"
+)
+async def get_user(
+        user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)"),
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получить конкретного пользователя по ID"""
+    return await cached_user_response(
+        ("id", user_id),
+        lambda: db.get(UserModel, user_id),
+        f"Пользователь с ID {user_id} не найден"
+    )
+
+
+@router.post(
+    "/",
+    response_model=User,
+    status_code=status.HTTP_201_CREATED,
+    summary="Создать нового пользователя",
+    description="Создает нового пользователя в базе данных"
+)
+async def create_user(user_in: UserCreate):
+    """Создать нового пользователя"""
+    # Хешируем пароль до захвата соединения записи
+    hashed_password = await run_in_threadpool(hash_password, user_in.password)
+
+    async def insert(db: AsyncSession) -> User:
+        db_user = UserModel(
+            username=user_in.username,
+            email=user_in.email,
+            age=user_in.age,
+            hashed_password=hashed_password
+        )
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        return User.model_validate(db_user)
+
+    try:
+        user = await write(insert)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пользователь с таким username или email уже существует"
+        )
+    # Мог быть закэширован 404 для этого id или username
+    user_cache.invalidate(("id", user.id), ("username", user.username))
+    return user
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkImportResult,
+    summary="Импорт пользователей",
+    description="Принимает CSV (text/csv, с заголовком username,email,password,age) или NDJSON потоком"
+)
+async def import_users(
+        request: Request,
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """Пакетный импорт пользователей (см. routers.users.run_import)"""
+
+    async def find_conflicts(rows: List[Tuple[int, UserCreate]]) -> Dict[int, str]:
+        if not rows:
+            return {}
+        return match_conflicts(rows, (await db.execute(conflicts_statement(rows))).all())
+
+    async def insert_chunk(rows: List[Tuple[int, UserCreate]], hashed: List[str]) -> Set[int]:
+        if not rows:
+            return set()
+
+        async def insert(write_db: AsyncSession) -> Set[str]:
+            inserted = set((await write_db.scalars(insert_statement(rows, hashed))).all())
+            await write_db.commit()
+            return inserted
+
+        while True:
+            try:
+                inserted_usernames = await run_write(insert)
+                break
+            except WriteQueueFullError:
+                # Импорт не прерываем - ждем, пока соединение записи освободится
+                await asyncio.sleep(0.1)
+        return {row for row, user in rows if user.username in inserted_usernames}
+
+    return await run_import(request, find_conflicts, insert_chunk)
+
+
+@router.put(
+    "/{user_id}",
+    response_model=User,
+    summary="Обновить данные пользователя",
+    description="Обновляет данные существующего пользователя"
+)
+async def update_user(
+        user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)"),
+        user_in: UserUpdate = ...
+):
+    """Обновить данные пользователя"""
+    update_data = user_in.dict(exclude_unset=True)
+
+    if "password" in update_data:
+        update_data["hashed_password"] = await run_in_threadpool(hash_password, update_data.pop("password"))
+
+    async def update_row(db: AsyncSession) -> Optional[User]:
+        row = (await db.execute(update_statement(user_id, update_data))).first()
+        await db.commit()
+        return None if row is None else User.model_validate(row)
+
+    try:
+        user = await write(update_row)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пользователь с таким username или email уже существует"
+        )
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Пользователь с ID {user_id} не найден"
+        )
+    # Старый username кэш помнит сам; новый мог быть закэширован как 404
+    user_cache.invalidate_user(user_id, ("username", user.username))
+    return user
+
+
+@router.delete(
+    "/{user_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Удалить пользователя",
+    description="Удаляет пользователя из базы данных"
+)
+async def delete_user(
+        user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)")
+):
+    """Удалить пользователя по ID"""
+
+    async def delete_row(db: AsyncSession) -> Optional[str]:
+        username = (await db.execute(delete_statement(user_id))).scalar_one_or_none()
+        await db.commit()
+        return username
+
+    username = await write(delete_row)
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Пользователь с ID {user_id} не найден"
+        )
+    user_cache.invalidate_user(user_id, ("username", username))
+    return None
+
+
+@router.post(
+    "/{user_id}/verify-password",
+    response_model=PasswordCheckResult,
+    summary="Проверить пароль пользователя",
+    description="Проверяет пароль; устаревший хеш (SHA-256 или старые параметры scrypt) при этом пересчитывается. "
+                "Внутренний эндпоинт для сервиса входа, без аутентификации - наружу не публиковать. "
+                "После PASSWORD_VERIFY_MAX_FAILURES неудачных проверок за PASSWORD_VERIFY_WINDOW секунд - 429"
+)
+async def verify_password(
+        user_id: int = Path(..., gt=0, description="ID пользователя (должен быть > 0)"),
+        check: PasswordCheck = ...,
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """Проверить пароль пользователя"""
+    hashed_password = await db.scalar(select(UserModel.hashed_password).where(UserModel.id == user_id))
+    if hashed_password is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Пользователь с ID {user_id} не найден"
+        )
+
+    start_password_check(user_id)
+    try:
+        valid, new_hash = await run_in_threadpool(password_hasher.verify, check.password, hashed_password)
+    except HashingBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    if valid:
+        failed_attempts.succeeded(user_id)
+
+    if new_hash is not None:
+        async def rehash(write_db: AsyncSession) -> None:
+            await write_db.execute(
+                sql_update(UserModel).where(UserModel.id == user_id).values(hashed_password=new_hash)
+            )
+            await write_db.commit()
+
+        await write(rehash)
+    return PasswordCheckResult(valid=valid)
+
+
+@router.get(
+    "/search/by-username/{username}",
+    response_model=User,
+    summary="Найти пользователя по username",
+    description="Поиск пользователя по точному совпадению username"
+)
+async def search_by_username(
+        username: str = Path(..., min_length=3, max_length=50),
+        db: AsyncSession = Depends(get_async_read_db)
+):
+    """Поиск пользователя по username"""
+    return await cached_user_response(
+        ("username", username),
+        lambda: db.scalar(select(UserModel).where(UserModel.username == username)),
+        f"Пользователь с username '{username}' не найден"
+    )
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field, EmailStr, field_validator
 from pydantic.types import constr, conint
 
@@ -56,4 +56,28 @@ class User(UserBase):
     id: int = Field(..., description="Уникальный ID пользователя")
 
     class Config:
-        from_attributes = True  # Для работы с ORM моделями
\ No newline at end of file
+        from_attributes = True  # Для работы с ORM моделями
+
+
+class PasswordCheck(BaseModel):
+    """Схема для проверки пароля"""
+    password: str = Field(..., description="Пароль для проверки")
+
+
+class PasswordCheckResult(BaseModel):
+    """Результат проверки пароля"""
+    valid: bool = Field(..., description="Пароль верный")
+
+
+class BulkRowError(BaseModel):
+    """Строка импорта, которая не была добавлена"""
+    row: int = Field(..., description="Номер строки данных (с 1, без заголовка CSV)")
+    reason: str = Field(..., description="invalid, duplicate_username или duplicate_email")
+    errors: List[dict] = Field(default_factory=list, description="Ошибки валидации")
+
+
+class BulkImportResult(BaseModel):
+    """Итог пакетного импорта"""
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
@@ -0,0 +1,152 @@
+"""
+Кэш ответов GET /users/{id} и GET /users/search/by-username/{username}.
+
+Хранит уже сериализованный JSON пользователя по двум ключам - ("id", id)
+и ("username", username). Записи живут ttl секунд, при переполнении
+вытесняется давно не использованная (LRU). Если negative_ttl > 0,
+кэшируются и 404 - как None.
+
+Кэш помнит, под какими ключами лежит каждый пользователь, поэтому после
+изменения достаточно invalidate_user(id): удаляются и ("id", id), и ключ
+со старым username, который уже неизвестен обработчику (UPDATE ... RETURNING
+возвращает только новые значения). Чтобы запрос, прочитавший
+БД до изменения, не положил в кэш устаревший ответ уже после invalidate(),
+put() принимает поколение, полученное через generation() перед чтением из БД,
+и ничего не сохраняет, если с тех пор была инвалидация.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+# 0 - не кэшировать "пользователь не найден"
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL", "0"))
+
+
+class UserCache:
+    """Ограниченный LRU-кэш с TTL для сериализованных пользователей"""
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL,
+                 negative_ttl: float = USER_CACHE_NEGATIVE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # ключ -> (истекает, JSON или None, id пользователя или None)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Optional[bytes], Optional[int]]]" = OrderedDict()
+        # id пользователя -> ключи, под которыми он лежит в кэше
+        self._user_keys: Dict[int, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable) -> Tuple[bool, Optional[bytes]]:
+        """(найдено ли, JSON или None для закэшированного 404)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            if value is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return True, value
+
+    def put(self, keys: Tuple[Hashable, ...], value: Optional[bytes], generation: int,
+            user_id: Optional[int] = None) -> None:
+        """Сохраняет ответ пользователя user_id под всеми ключами; None - закэшировать 404 (если включено)"""
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            if generation != self._generation:
+                return
+            for key in keys:
+                self._remove(key)
+                self._entries[key] = (expires_at, value, user_id)
+                if user_id is not None:
+                    self._user_keys.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._remove(key):
+                    self.invalidations += 1
+
+    def invalidate_user(self, user_id: int, *keys: Hashable) -> None:
+        """Удаляет все закэшированные ответы пользователя и дополнительно ключи keys"""
+        with self._lock:
+            self._generation += 1
+            for key in (*self._user_keys.get(user_id, ()), ("id", user_id), *keys):
+                if self._remove(key):
+                    self.invalidations += 1
+
+    def drop_negative(self) -> None:
+        """Удаляет все закэшированные 404 (после массового добавления пользователей)"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, (_, value, _) in self._entries.items() if value is None]:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def stats(self) -> dict:
+        requests = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.negative_hits) / requests, 4) if requests else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> bool:
+        """Удаляет запись (под self._lock); True, если она была"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        user_id = entry[2]
+        if user_id is not None:
+            user_keys = self._user_keys.get(user_id)
+            if user_keys is not None:
+                user_keys.discard(key)
+                if not user_keys:
+                    del self._user_keys[user_id]
+        return True
+
+
+user_cache = UserCache()
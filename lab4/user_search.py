@@ -0,0 +1,183 @@
+"""
+Поиск пользователей по подстроке username и email: FTS5 с токенизатором trigram.
+
+users_fts - обычная (не external content) таблица FTS5 с rowid = users.id,
+ее поддерживают триггеры на INSERT, DELETE и UPDATE OF username, email.
+Удаление по rowid, которого нет в индексе, безопасно, поэтому таблица
+не портится, даже если backfill для старой БД еще не запускался.
+
+Результаты ранжируются по уровням, и каждый уровень - проход по индексу
+с LIMIT, без подсчета релевантности всех совпадений (bm25 по десяткам
+тысяч совпадений с "gmail" занимает десятки миллисекунд):
+  0 - username или email совпадает с запросом полностью;
+  1 - username начинается с запроса;
+  2 - остальные совпадения подстроки из users_fts в порядке id.
+Уровни 0 и 1 сравнивают lower(username) и lower(email) по индексам
+на этих выражениях. lower() в SQLite меняет регистр только латиницы,
+поэтому, например, "ПЕТЯ" и "петя" попадут в уровень 2 (trigram
+регистр не различает) - найдены, но без подъема в ранжировании.
+Курсор - (уровень, ключ последней строки уровня).
+
+Для БД, созданной до появления поиска, индекс заполняется один раз:
+    python user_search.py backfill
+"""
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Запрос короче трех символов не содержит ни одной триграммы
+SEARCH_MIN_LENGTH = 3
+BACKFILL_CHUNK_SIZE = 10000
+
+SEARCH_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(username, email, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        DELETE FROM users_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username, email ON users BEGIN
+        UPDATE users_fts SET username = new.username, email = new.email WHERE rowid = old.id;
+    END""",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))",
+)
+
+# Уровень, в котором ключ курсора - пара (lower(username), id)
+PREFIX_TIER = 1
+
+SEARCH_TIERS = (
+    # 0: полное совпадение (индексы ix_users_username_lower и ix_users_email_lower)
+    """SELECT id, username, email, age, id AS search_key FROM users
+       WHERE (lower(username) = :q OR lower(email) = :q) AND id > :after
+       ORDER BY id LIMIT :limit""",
+    # 1: username начинается с запроса - диапазон по ix_users_username_lower;
+    # в индексе за выражением идет rowid, поэтому (lower(username), id) - ключ без дублей
+    """SELECT id, username, email, age, lower(username) AS search_key FROM users
+       WHERE lower(username) > :q AND lower(username) < :upper
+         AND (lower(username), id) > (:after, :after_id) AND lower(email) != :q
+       ORDER BY lower(username), id LIMIT :limit""",
+    # 2: остальные вхождения подстроки, по возрастанию id
+    """SELECT users.id, users.username, users.email, users.age, users.id AS search_key
+       FROM users_fts JOIN users ON users.id = users_fts.rowid
+       WHERE users_fts MATCH :match AND users_fts.rowid > :after
+         AND NOT (lower(users.username) >= :q AND lower(users.username) < :upper)
+         AND lower(users.email) != :q
+       ORDER BY users_fts.rowid LIMIT :limit""",
+)
+
+# lower() в SQLite: только A-Z -> a-z
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def create_search_index(engine: Engine) -> None:
+    """Создает users_fts и триггеры, если их нет (при старте приложения)"""
+    with engine.begin() as conn:
+        created = conn.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+        )).scalar() == 0
+        for statement in SEARCH_INDEX_DDL:
+            conn.execute(text(statement))
+        if created and conn.execute(text("SELECT EXISTS (SELECT 1 FROM users)")).scalar():
+            print("Индекс поиска создан для непустой таблицы users: запустите python user_search.py backfill")
+
+
+def backfill(engine: Engine, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Добавляет в users_fts пользователей, которых там нет. Идет по диапазонам id,
+    одна транзакция на диапазон - приложение может писать в БД между ними.
+    """
+    added = 0
+    with engine.connect() as conn:
+        last_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM users")).scalar()
+    for start in range(0, last_id, chunk_size):
+        with engine.begin() as conn:
+            added += conn.execute(text(
+                """INSERT INTO users_fts(rowid, username, email)
+                   SELECT id, username, email FROM users
+                   WHERE id > :start AND id <= :end
+                     AND id NOT IN (SELECT rowid FROM users_fts WHERE rowid > :start AND rowid <= :end)"""
+            ), {"start": start, "end": start + chunk_size}).rowcount
+    return added
+
+
+def prefix_upper(prefix: str):
+    """
+    Наименьшее значение больше всех строк, начинающихся с prefix, при двоичном
+    сравнении (порядок байт UTF-8 совпадает с порядком кодовых точек).
+    Последний символ увеличивается на единицу: U+10FFFF в конце отбрасываются,
+    суррогаты (их нет в UTF-8) пропускаются. Если prefix - одни U+10FFFF,
+    граница - BLOB: в SQLite любой BLOB больше любой строки.
+    """
+    stripped = prefix.rstrip("\U0010ffff")
+    if not stripped:
+        return b"\xff"
+    code = ord(stripped[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    return stripped[:-1] + chr(code)
+
+
+def is_search_key(tier: int, key: object) -> bool:
+    """Подходит ли key из курсора уровню tier (чтобы в SQL не попали значения другого типа)"""
+    if tier == PREFIX_TIER:
+        return isinstance(key, list) and len(key) == 2 and isinstance(key[0], str) \
+            and isinstance(key[1], int) and not isinstance(key[1], bool)
+    return isinstance(key, int) and not isinstance(key, bool)
+
+
+def search_queries(q: str, position: Optional[Tuple[int, object]]):
+    """
+    (уровень, SQL, параметры) по порядку уровней, начиная с позиции курсора
+    (уровень, ключ последней строки). Вызывающий выполняет их, добавляя
+    limit - сколько строк осталось до конца страницы, пока она не заполнится.
+    """
+    first_tier, after = position if position is not None else (0, None)
+    folded = q.translate(_ASCII_LOWER)
+    params = {
+        "q": folded,
+        # Верхняя граница диапазона "начинается с q"
+        "upper": prefix_upper(folded),
+        # Фраза в кавычках: для trigram - поиск подстроки без учета регистра
+        "match": '"' + q.replace('"', '""') + '"',
+    }
+    for tier in range(first_tier, len(SEARCH_TIERS)):
+        if tier != first_tier or after is None:
+            after = [folded, 0] if tier == PREFIX_TIER else 0
+        if tier == PREFIX_TIER:
+            yield tier, text(SEARCH_TIERS[tier]), {**params, "after": after[0], "after_id": after[1]}
+        else:
+            yield tier, text(SEARCH_TIERS[tier]), {**params, "after": after}
+
+
+def collect_page(rows: List[tuple], tier: int, page: list, limit: int) -> Optional[Tuple[int, object]]:
+    """Добавляет строки уровня в страницу; при заполнении - позиция для курсора следующей"""
+    for row in rows:
+        page.append(row)
+        if len(page) == limit:
+            return tier, [row.search_key, row.id] if tier == PREFIX_TIER else row.search_key
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Индекс поиска пользователей (FTS5 trigram)")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from database import Base, engine
+    import models  # noqa: F401 - регистрирует таблицу users
+
+    Base.metadata.create_all(bind=engine)
+    create_search_index(engine)
+    started = time.perf_counter()
+    added = backfill(engine, args.chunk_size)
+    print(f"В индекс поиска добавлено пользователей: {added} за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
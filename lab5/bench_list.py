@@ -0,0 +1,164 @@
+"""
+GET /todos/ на большой таблице: план запроса, полнота пагинации и задержка.
+
+Во временном каталоге создается БД lab5 с --todos задачами (по --per-second
+задач на одну секунду created_at, чтобы ключ страницы часто совпадал
+по created_at; каждая --pending-every-я не выполнена). Составные индексы
+создаются после заполнения - как при старте приложения на существующей БД.
+
+Затем:
+  1. EXPLAIN QUERY PLAN для основных видов запроса: ожидается SEARCH/SCAN
+     по составному индексу без USE TEMP B-TREE FOR ORDER BY;
+  2. обход всех невыполненных задач по X-Next-Cursor в обе стороны
+     и сверка с выборкой напрямую из SQLite (без пропусков и повторов);
+  3. p50/p99 в миллисекундах для первой и далекой страницы, а также время
+     получения той же страницы невыполненных задач запросами GET /todos/{id}.
+При ошибке в пунктах 1-2 завершается с кодом 1.
+
+Запуск из каталога lab5:
+    python bench_list.py --todos 1000000 --queries 200
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+
+START = datetime(2024, 1, 1)
+
+
+def fill(path: str, todos: int, per_second: int, pending_every: int) -> None:
+    rows = []
+    for n in range(todos):
+        created_at = (START + timedelta(seconds=n // per_second)).strftime("%Y-%m-%d %H:%M:%S")
+        rows.append((f"Задача {n}", None, n % pending_every != 0, created_at))
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO todos (title, description, completed, created_at) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def timed(client, queries: int, url: str, params: dict) -> list:
+    latencies = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        response = client.get(url, params=params)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--todos", type=int, default=1000000)
+    parser.add_argument("--per-second", type=int, default=7)
+    parser.add_argument("--pending-every", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_list_"))
+    from fastapi.testclient import TestClient
+    from sqlalchemy.dialects import sqlite
+
+    from database import Base, engine
+    from routers.todos import encode_cursor, list_statement
+
+    # Таблица без составных индексов - как БД, созданная до GET /todos/
+    Base.metadata.create_all(bind=engine)
+    conn = sqlite3.connect("lab5_todos.db")
+    conn.execute("DROP INDEX ix_todos_completed_created_at_id")
+    conn.execute("DROP INDEX ix_todos_created_at_id")
+    conn.close()
+    started = time.perf_counter()
+    fill("lab5_todos.db", args.todos, args.per_second, args.pending_every)
+    print(f"fill {args.todos} todos: {time.perf_counter() - started:.1f} s")
+
+    # Импорт main создает недостающие индексы, как при старте приложения
+    started = time.perf_counter()
+    from main import app
+    print(f"startup (create indexes): {time.perf_counter() - started:.1f} s")
+
+    failures = 0
+    middle = START + timedelta(seconds=args.todos // args.per_second // 2)
+    plans = {
+        "pending": dict(completed=False),
+        "pending desc": dict(completed=False, order="desc"),
+        "pending cursor": dict(completed=False, cursor=encode_cursor("asc", str(middle), args.todos // 2)),
+        "pending range": dict(completed=False, created_from=middle, created_to=middle + timedelta(hours=1)),
+        "all": dict(),
+        "all range desc": dict(created_from=middle, order="desc"),
+    }
+    conn = sqlite3.connect("lab5_todos.db")
+    print("\nplan")
+    for name, params in plans.items():
+        statement = list_statement(("id", "title"), params.get("completed"), params.get("created_from"),
+                                   params.get("created_to"), params.get("order", "asc"), args.limit,
+                                   params.get("cursor"))
+        compiled = statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {compiled}")]
+        ok = len(plan) == 1 and "USING INDEX ix_todos_" in plan[0] and "TEMP B-TREE" not in " ".join(plan)
+        failures += not ok
+        print(f"  {name:<16} {'ok' if ok else 'FAIL'}  {' | '.join(plan)}")
+
+    with TestClient(app) as client:
+        print("\npagination (completed=false)")
+        for order in ("asc", "desc"):
+            expected = [row[0] for row in conn.execute(
+                f"SELECT id FROM todos WHERE completed = 0 ORDER BY created_at {order}, id {order}")]
+            seen, params, pages = [], {"completed": "false", "order": order, "limit": args.limit, "fields": "id"}, 0
+            while True:
+                response = client.get("/todos/", params=params)
+                assert response.status_code == 200, response.text
+                seen += [todo["id"] for todo in response.json()]
+                pages += 1
+                if "x-next-cursor" not in response.headers:
+                    break
+                params["cursor"] = response.headers["x-next-cursor"]
+            ok = seen == expected
+            failures += not ok
+            print(f"  {order:<5} {pages} pages, {len(seen)} of {len(expected)} todos {'ok' if ok else 'FAIL'}")
+
+        print(f"\n{'query':<30} {'p50 ms':>8} {'p99 ms':>8}")
+        deep = client.get("/todos/", params={"completed": "false", "created_to": middle, "order": "desc",
+                                             "limit": 1}).headers["x-next-cursor"]
+        cases = {
+            "pending, first page": {"completed": "false"},
+            "pending, deep page": {"completed": "false", "cursor": deep, "order": "desc"},
+            "pending, fields=id,title": {"completed": "false", "fields": "id,title"},
+            "pending, 1 hour range": {"completed": "false", "created_from": middle,
+                                      "created_to": middle + timedelta(hours=1)},
+            "all, first page": {},
+        }
+        for name, params in cases.items():
+            latencies = timed(client, args.queries, "/todos/", {"limit": args.limit, **params})
+            print(f"{name:<30} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.99):>8.2f}")
+
+        # Та же страница невыполненных задач по одной через GET /todos/{id}
+        ids = [todo["id"] for todo in client.get("/todos/", params={"completed": "false", "limit": args.limit,
+                                                                    "fields": "id"}).json()]
+        latencies = []
+        for _ in range(max(1, args.queries // 10)):
+            started = time.perf_counter()
+            for todo_id in ids:
+                assert client.get(f"/todos/{todo_id}").status_code == 200
+            latencies.append(time.perf_counter() - started)
+        print(f"{f'{len(ids)} x GET /todos/{{id}}':<30} {percentile(latencies, 0.5):>8.2f} "
+              f"{percentile(latencies, 0.99):>8.2f}")
+    conn.close()
+    print("\nOK" if not failures else f"\nFAIL: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
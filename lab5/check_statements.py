@@ -0,0 +1,82 @@
+"""
+Проверка числа SQL-инструкций на запрос для PUT и DELETE /todos/{id}.
+
+Обновление и удаление должны укладываться в одну инструкцию
+(UPDATE ... RETURNING / DELETE ... RETURNING) и в синхронном, и в асинхронном
+роутере - в том числе при 404. Инструкции
+считаются по событию before_cursor_execute на всех движках; прагмы при
+открытии соединения и COMMIT в счет не входят. Работает на временной БД.
+При расхождении завершается с кодом 1, поэтому годится для CI.
+
+Запуск из каталога lab5:
+    python check_statements.py
+"""
+import os
+import sys
+import tempfile
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+# Относительный путь к БД (./lab5_todos.db) - во временном каталоге
+os.chdir(tempfile.mkdtemp(prefix="check_statements_"))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import database  # noqa: E402
+import database_async  # noqa: E402
+from routers import todos, todos_async  # noqa: E402
+
+statements = []
+for engine in (database.engine, database_async.async_engine.sync_engine):
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *_: statements.append(statement))
+
+
+def check(client: TestClient, mode: str) -> int:
+    """Прогоняет сценарии и возвращает число несовпадений"""
+    ids = []
+    for name in ("first", "second"):
+        response = client.post("/todos/", json={"title": f"{mode} {name}"})
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    first, second = ids
+    missing = second + 1000
+
+    cases = [
+        ("PUT completed", "PUT", f"/todos/{first}", {"completed": True}, 200),
+        ("PUT title", "PUT", f"/todos/{first}", {"title": f"{mode} renamed", "description": "text"}, 200),
+        ("PUT empty", "PUT", f"/todos/{first}", {}, 200),
+        ("PUT missing", "PUT", f"/todos/{missing}", {"completed": True}, 404),
+        ("DELETE", "DELETE", f"/todos/{second}", None, 200),
+        ("DELETE missing", "DELETE", f"/todos/{second}", None, 404),
+    ]
+    failures = 0
+    for name, method, url, body, expected_status in cases:
+        statements.clear()
+        response = client.request(method, url, json=body)
+        ok = response.status_code == expected_status and len(statements) == 1
+        failures += not ok
+        print(f"{mode:<6} {name:<16} {response.status_code:>4} {len(statements):>3} {'ok' if ok else 'FAIL'}")
+        if not ok:
+            for statement in statements:
+                print("       ", " ".join(statement.split()))
+    return failures
+
+
+def main() -> int:
+    database.Base.metadata.create_all(bind=database.engine)
+    print(f"{'mode':<6} {'request':<16} {'code':>4} {'sql':>3}")
+    failures = 0
+    for mode, router in (("sync", todos.router), ("async", todos_async.router)):
+        app = FastAPI()
+        app.include_router(router)
+        with TestClient(app) as client:
+            failures += check(client, mode)
+            if mode == "async":
+                client.portal.call(database_async.async_engine.dispose)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Та же база, что и в database.py, но через асинхронный драйвер aiosqlite
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./lab5_todos.db"
+
+# Пул как у синхронного движка (aiosqlite по умолчанию открывает соединение на каждый запрос)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool)
+
+# expire_on_commit=False: после commit атрибуты доступны без нового запроса к БД
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Dependency для получения асинхронной сессии БД
+async def get_async_db():
+    """Генератор для получения асинхронной сессии базы данных"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,14 +1,36 @@
 from fastapi import FastAPI
-from database import engine, Base
-from routers.todos import router
+from contextlib import asynccontextmanager
+from database import DB_MODE, engine, Base
+from models import Todo as TodoModel
+
+# Синхронные или асинхронные эндпоинты - по DB_MODE
+if DB_MODE == "async":
+    from database_async import async_engine
+    from routers.todos_async import router
+else:
+    from routers.todos import router
 
 # Создаем таблицы при запуске приложения
 Base.metadata.create_all(bind=engine)
+# create_all не добавляет индексы в уже существующую таблицу - составные
+# индексы для GET /todos/ создаются отдельно
+for index in TodoModel.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Соединения aiosqlite держат свои потоки - закрываем их при остановке
+    if DB_MODE == "async":
+        await async_engine.dispose()
+
 
 # Создаем приложение FastAPI
 app = FastAPI(
     title="Lab5: Todo List API",
-    description="CRUD API для управления задачами"
+    description="CRUD API для управления задачами",
+    lifespan=lifespan
 )
 
 # Подключаем роутер
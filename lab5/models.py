@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 from database import Base
 
@@ -12,4 +12,11 @@ class Todo(Base):
     description = Column(Text, nullable=True)
     completed = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # GET /todos/ с фильтром completed: страница по (created_at, id) - один проход по диапазону индекса
+        Index("ix_todos_completed_created_at_id", "completed", "created_at", "id"),
+        # GET /todos/ без фильтра completed
+        Index("ix_todos_created_at_id", "created_at", "id"),
+    )
@@ -1,16 +1,131 @@
-from fastapi import APIRouter, HTTPException, Path, Depends, status
+from fastapi import APIRouter, HTTPException, Path, Depends, Query, Response, status
+from sqlalchemy import String, delete, select, tuple_, type_coerce, update
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import List, Literal, Optional, Tuple
+import base64
+import binascii
+import json
 
 from database import get_db
 from models import Todo as TodoModel
-from schemas import Todo, TodoCreate, TodoUpdate
+from schemas import Todo, TodoCreate, TodoFields, TodoUpdate
 
 router = APIRouter(
     prefix="/todos",
     tags=["todos"],
 )
 
+TODO_COLUMNS = (
+    TodoModel.id, TodoModel.title, TodoModel.description, TodoModel.completed,
+    TodoModel.created_at, TodoModel.updated_at
+)
+TODO_FIELDS = tuple(column.key for column in TODO_COLUMNS)
+
+# created_at хранится текстом 'YYYY-MM-DD HH:MM:SS' (CURRENT_TIMESTAMP, UTC).
+# datetime привязывается как '... .000000' и с ним не равен, поэтому ключ
+# страницы и границы фильтра сравниваются с сохраненным текстом
+CREATED_AT_KEY = type_coerce(TodoModel.created_at, String)
+
+
+def update_statement(todo_id: int, values: dict):
+    """UPDATE ... RETURNING: одна инструкция вместо SELECT, UPDATE и refresh"""
+    return (
+        update(TodoModel).where(TodoModel.id == todo_id)
+        .values(**values, updated_at=datetime.now())  # Обновляем время изменения
+        .returning(*TODO_COLUMNS).execution_options(synchronize_session=False)
+    )
+
+
+def delete_statement(todo_id: int):
+    """DELETE ... RETURNING id: по результату видно, была ли задача"""
+    return (
+        delete(TodoModel).where(TodoModel.id == todo_id)
+        .returning(TodoModel.id).execution_options(synchronize_session=False)
+    )
+
+
+def created_at_key(value: datetime) -> str:
+    """Граница фильтра по created_at в формате сохраненного значения"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=" ")
+
+
+def encode_cursor(order: str, created_at: str, todo_id: int) -> str:
+    """Непрозрачный курсор: направление сортировки и ключ (created_at, id) последней задачи"""
+    return base64.urlsafe_b64encode(json.dumps([order, created_at, todo_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str, order: str) -> Tuple[str, int]:
+    try:
+        cursor_order, created_at, todo_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(created_at, str) or not isinstance(todo_id, int):
+            raise ValueError
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+    if cursor_order != order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Курсор получен для другой сортировки"
+        )
+    return created_at, todo_id
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Поля ответа из строки "id,title"; без fields - все"""
+    if fields is None:
+        return TODO_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in TODO_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(f"Неизвестные поля: {', '.join(unknown)}" if unknown else "Не указаны поля")
+            + f"; допустимые: {', '.join(TODO_FIELDS)}"
+        )
+    return names
+
+
+def list_statement(fields: Tuple[str, ...], completed: Optional[bool], created_from: Optional[datetime],
+                   created_to: Optional[datetime], order: str, limit: int, cursor: Optional[str]):
+    """
+    Страница задач по (created_at, id): фильтры и курсор задают диапазон
+    составного индекса, ORDER BY совпадает с его порядком - без сортировки
+    и без чтения строк вне страницы. Выбираются только запрошенные поля
+    и ключ страницы для курсора.
+    """
+    columns = [column for column in TODO_COLUMNS if column.key in fields]
+    statement = select(*columns, CREATED_AT_KEY.label("key_created_at"), TodoModel.id.label("key_id"))
+    if completed is not None:
+        statement = statement.where(TodoModel.completed == completed)
+    if created_from is not None:
+        statement = statement.where(CREATED_AT_KEY >= created_at_key(created_from))
+    if created_to is not None:
+        statement = statement.where(CREATED_AT_KEY < created_at_key(created_to))
+    key = tuple_(CREATED_AT_KEY, TodoModel.id)
+    if cursor is not None:
+        after = tuple_(*decode_cursor(cursor, order))
+        statement = statement.where(key > after if order == "asc" else key < after)
+    if order == "asc":
+        statement = statement.order_by(TodoModel.created_at, TodoModel.id)
+    else:
+        statement = statement.order_by(TodoModel.created_at.desc(), TodoModel.id.desc())
+    return statement.limit(limit)
+
+
+def todo_page(rows, fields: Tuple[str, ...]) -> List[TodoFields]:
+    return [TodoFields(**{name: getattr(row, name) for name in fields}) for row in rows]
+
+
+def set_next_cursor(response: Response, rows, limit: int, order: str) -> None:
+    """Полная страница - в X-Next-Cursor курсор следующей"""
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(order, rows[-1].key_created_at, rows[-1].key_id)
+
 
 @router.post(
     "/",
@@ -39,6 +154,35 @@ def create_todo(
     return db_todo
 
 
+@router.get(
+    "/",
+    response_model=List[TodoFields],
+    response_model_exclude_unset=True,
+    summary="Получить список задач",
+    description="Страница задач по (created_at, id); курсор следующей страницы - в заголовке X-Next-Cursor"
+)
+def list_todos(
+        response: Response,
+        completed: Optional[bool] = Query(None, description="Только выполненные (true) или невыполненные (false)"),
+        created_from: Optional[datetime] = Query(None, description="created_at не раньше (включительно)"),
+        created_to: Optional[datetime] = Query(None, description="created_at раньше (не включительно)"),
+        order: Literal["asc", "desc"] = "asc",
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor предыдущей страницы"),
+        fields: Optional[str] = Query(None, description="Поля ответа через запятую, например id,title"),
+        db: Session = Depends(get_db)
+):
+    """
+    Получить список задач с фильтрами и пагинацией по курсору.
+    Например, невыполненные задачи - completed=false: одна выборка по индексу
+    (completed, created_at, id) вместо запросов GET /todos/{id} по одной задаче.
+    """
+    names = parse_fields(fields)
+    rows = db.execute(list_statement(names, completed, created_from, created_to, order, limit, cursor)).all()
+    set_next_cursor(response, rows, limit, order)
+    return todo_page(rows, names)
+
+
 @router.get(
     "/{todo_id}",
     response_model=Todo,
@@ -75,8 +219,11 @@ def update_todo(
     """
     Обновить существующую задачу.
     """
-    # Находим задачу
-    todo = db.query(TodoModel).filter(TodoModel.id == todo_id).first()
+    # Обновляем только переданные поля
+    update_data = todo_update.model_dump(exclude_unset=True)
+
+    todo = db.execute(update_statement(todo_id, update_data)).first()
+    db.commit()
 
     if not todo:
         raise HTTPException(
@@ -84,19 +231,7 @@ def update_todo(
             detail=f"Задача с ID {todo_id} не найдена"
         )
 
-    # Обновляем только переданные поля
-    update_data = todo_update.model_dump(exclude_unset=True)
-
-    for field, value in update_data.items():
-        setattr(todo, field, value)
-
-    # Обновляем время изменения
-    todo.updated_at = datetime.now()
-
-    db.commit()
-    db.refresh(todo)
-
-    return todo
+    return Todo.model_validate(todo)
 
 
 @router.delete(
@@ -110,17 +245,14 @@ def delete_todo(
     """
     Удалить задачу по её ID.
     """
-    # Находим задачу
-    todo = db.query(TodoModel).filter(TodoModel.id == todo_id).first()
+    # Удаляем задачу
+    deleted_id = db.execute(delete_statement(todo_id)).scalar_one_or_none()
+    db.commit()
 
-    if not todo:
+    if deleted_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Задача с ID {todo_id} не найдена"
         )
 
-    # Удаляем задачу
-    db.delete(todo)
-    db.commit()
-
     return {"message": "Задача успешно удалена"}
\ No newline at end of file
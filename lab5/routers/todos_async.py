@@ -0,0 +1,145 @@
+from fastapi import APIRouter, HTTPException, Path, Depends, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from database_async import get_async_db
+from models import Todo as TodoModel
+from routers.todos import (
+    delete_statement, list_statement, parse_fields, set_next_cursor, todo_page, update_statement
+)
+from schemas import Todo, TodoCreate, TodoFields, TodoUpdate
+
+# Асинхронные версии эндпоинтов routers/todos.py (DB_MODE=async)
+router = APIRouter(
+    prefix="/todos",
+    tags=["todos"],
+)
+
+
+@router.post(
+    "/",
+    response_model=Todo,
+    status_code=status.HTTP_201_CREATED,
+    summary="Создать новую задачу"
+)
+async def create_todo(
+        todo_in: TodoCreate,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Создать новую задачу (Todo элемент).
+    """
+    db_todo = TodoModel(
+        title=todo_in.title,
+        description=todo_in.description,
+        completed=False  # По умолчанию задача не выполнена
+    )
+
+    db.add(db_todo)
+    await db.commit()
+    # created_at заполняет сама БД
+    await db.refresh(db_todo)
+
+    return db_todo
+
+
+@router.get(
+    "/",
+    response_model=List[TodoFields],
+    response_model_exclude_unset=True,
+    summary="Получить список задач",
+    description="Страница задач по (created_at, id); курсор следующей страницы - в заголовке X-Next-Cursor"
+)
+async def list_todos(
+        response: Response,
+        completed: Optional[bool] = Query(None, description="Только выполненные (true) или невыполненные (false)"),
+        created_from: Optional[datetime] = Query(None, description="created_at не раньше (включительно)"),
+        created_to: Optional[datetime] = Query(None, description="created_at раньше (не включительно)"),
+        order: Literal["asc", "desc"] = "asc",
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor предыдущей страницы"),
+        fields: Optional[str] = Query(None, description="Поля ответа через запятую, например id,title"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить список задач с фильтрами и пагинацией по курсору.
+    """
+    names = parse_fields(fields)
+    rows = (await db.execute(list_statement(names, completed, created_from, created_to, order, limit, cursor))).all()
+    set_next_cursor(response, rows, limit, order)
+    return todo_page(rows, names)
+
+
+@router.get(
+    "/{todo_id}",
+    response_model=Todo,
+    summary="Получить задачу по ID"
+)
+async def get_todo(
+        todo_id: int = Path(..., gt=0, description="ID задачи"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить задачу по её ID.
+    """
+    todo = await db.get(TodoModel, todo_id)
+
+    if not todo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Задача с ID {todo_id} не найдена"
+        )
+
+    return todo
+
+
+@router.put(
+    "/{todo_id}",
+    response_model=Todo,
+    summary="Обновить существующую задачу"
+)
+async def update_todo(
+        todo_id: int = Path(..., gt=0, description="ID задачи"),
+        todo_update: TodoUpdate = ...,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Обновить существующую задачу.
+    """
+    # Обновляем только переданные поля
+    update_data = todo_update.model_dump(exclude_unset=True)
+
+    todo = (await db.execute(update_statement(todo_id, update_data))).first()
+    await db.commit()
+
+    if not todo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Задача с ID {todo_id} не найдена"
+        )
+
+    return Todo.model_validate(todo)
+
+
+@router.delete(
+    "/{todo_id}",
+    summary="Удалить задачу"
+)
+async def delete_todo(
+        todo_id: int = Path(..., gt=0, description="ID задачи"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Удалить задачу по её ID.
+    """
+    deleted_id = (await db.execute(delete_statement(todo_id))).scalar_one_or_none()
+    await db.commit()
+
+    if deleted_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Задача с ID {todo_id} не найдена"
+        )
+
+    return {"message": "Задача успешно удалена"}
@@ -29,4 +29,14 @@ class Todo(TodoBase):
     updated_at: Optional[datetime]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class TodoFields(BaseModel):
+    """Задача в списке: только поля, запрошенные в fields"""
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
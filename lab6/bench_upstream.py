@@ -0,0 +1,94 @@
+"""
+Бенчмарк обращений к внешним API: запросы к приложению идут пачками по
+--concurrency одновременных, внешние API подменены локальной заглушкой
+с задержкой (а при необходимости - с медленными ответами и отказами).
+Запросы к приложению отправляет httpx (в requirements.txt он нужен только
+для этого бенчмарка, самому приложению не требуется).
+
+Запуск из каталога lab6:
+    python bench_upstream.py --requests 50 --latency 0.2
+    python bench_upstream.py --requests 400 --concurrency 10 --latency 0.05 --slow-fraction 0.05 --hedge
+    python bench_upstream.py --requests 100 --concurrency 10 --fail-rate 1.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from fake_upstream import FakeUpstream, free_port
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(args) -> None:
+    fake = FakeUpstream(
+        latency=args.latency,
+        slow_fraction=args.slow_fraction,
+        slow_latency=args.slow_latency,
+        fail_rate=args.fail_rate
+    )
+    fake.port = free_port()
+    os.environ["GOOGLE_BOOKS_API_URL"] = f"{fake.base_url}/books/v1"
+    os.environ["CHUCK_NORRIS_API_URL"] = fake.base_url
+    os.environ["UPSTREAM_HEDGE"] = "1" if args.hedge else "0"
+    await fake.start()
+
+    import main  # импорт после настройки адресов заглушки
+
+    async def timed_get(client):
+        started = time.perf_counter()
+        response = await client.get(args.path)
+        return response.status_code, time.perf_counter() - started
+
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=None) as client:
+            fake.reset_stats()
+            started = time.perf_counter()
+            concurrency = args.concurrency or args.requests
+            for offset in range(0, args.requests, concurrency):
+                batch = min(concurrency, args.requests - offset)
+                results += await asyncio.gather(*(timed_get(client) for _ in range(batch)))
+            elapsed = time.perf_counter() - started
+            metrics = (await client.get("/metrics")).json()
+
+    await fake.stop()
+
+    failed = sum(1 for status, _ in results if status != 200)
+    latencies = [seconds for _, seconds in results]
+    serial = fake.requests_total * args.latency
+    print(f"path:                 {args.path}")
+    print(f"requests:             {args.requests} (errors: {failed})")
+    print(f"upstream calls:       {fake.requests_total} ({fake.requests_total / args.requests:.2f} per request)")
+    print(f"upstream latency:     {args.latency * 1000:.0f} ms")
+    print(f"wall time:            {elapsed * 1000:.0f} ms")
+    print(f"serial would take:    {serial * 1000:.0f} ms")
+    print(f"max upstream overlap: {fake.max_in_flight}")
+    print(f"latency p50 / p99:    {statistics.median(latencies) * 1000:.0f} / "
+          f"{percentile(latencies, 0.99) * 1000:.0f} ms")
+    for name, stats in metrics.items():
+        print(f"{name}: {stats}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=0, help="0 - все запросы сразу")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--slow-fraction", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--hedge", action="store_true", help="включить hedged requests")
+    parser.add_argument("--path", default="/jokes/random/json")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
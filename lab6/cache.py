@@ -0,0 +1,330 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+Loader = Callable[[], Awaitable[Any]]
+Entry = Tuple[Any, float]  # (значение, время сохранения)
+
+
+class TTLCache:
+    """
+    Асинхронный кэш в памяти процесса с временем жизни записей.
+
+    Одновременные промахи по одному ключу объединяются (single-flight):
+    во внешний API уходит один запрос, остальные вызовы ждут его результат.
+    При stale_while_revalidate=True устаревшее значение отдается сразу,
+    а обновление выполняется в фоне. max_stale ограничивает возраст
+    устаревших значений (сверх ttl), которые еще можно отдавать.
+    """
+
+    def __init__(self, ttl: float, stale_while_revalidate: bool = False, max_stale: Optional[float] = None):
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale = max_stale
+        self._entries: Dict[Hashable, Entry] = {}
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    async def get(self, key: Hashable, loader: Loader) -> Any:
+        """Значение из кэша или результат loader() при промахе"""
+        entry = await self._fetch(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                return value
+            if self.max_stale is not None and age >= self.ttl + self.max_stale:
+                entry = None
+            elif self.stale_while_revalidate:
+                self.stale_hits += 1
+                self._refresh(key, loader)
+                return value
+
+        self.misses += 1
+        if key in self._in_flight:
+            self.coalesced += 1
+        task = self._refresh(key, loader)
+        try:
+            # shield: отмена одного из ожидающих не должна отменять общий запрос
+            return await asyncio.shield(task)
+        except Exception:
+            if entry is not None:
+                # Внешний API недоступен - лучше устаревшие данные, чем ошибка
+                return entry[0]
+            raise
+
+    def _refresh(self, key: Hashable, loader: Loader) -> asyncio.Task:
+        """Запускает загрузку значения, если она еще не идет"""
+        task = self._in_flight.get(key)
+        if task is None:
+            self.refreshes += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._in_flight[key] = task
+            # Исключение фоновой загрузки не должно попадать в лог как "never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _load(self, key: Hashable, loader: Loader) -> Any:
+        try:
+            value = await loader()
+        except Exception:
+            self.errors += 1
+            raise
+        else:
+            self._store(key, value)
+            return value
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _lookup(self, key: Hashable) -> Optional[Entry]:
+        return self._entries.get(key)
+
+    async def _fetch(self, key: Hashable) -> Optional[Entry]:
+        """Запись для get(); наследник может дочитывать ее не из памяти"""
+        return self._lookup(key)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.time())
+
+    def prefetch(self, key: Hashable, loader: Loader) -> None:
+        """Запускает фоновую загрузку, если значения нет или оно устарело"""
+        entry = self._lookup(key)
+        if entry is None or time.time() - entry[1] >= self.ttl:
+            self._refresh(key, loader)
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Значение без обращения к загрузчику (даже устаревшее)"""
+        entry = self._lookup(key)
+        return entry[0] if entry is not None else None
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "stale_while_revalidate": self.stale_while_revalidate,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "hit_ratio": round((self.hits + self.stale_hits) / requests, 4) if requests else 0.0,
+        }
+
+
+class PersistentCache(TTLCache):
+    """
+    Двухуровневый кэш: LRU в памяти поверх SQLite-файла на диске.
+
+    Значения должны сериализоваться в JSON. Дисковый уровень переживает
+    перезапуск приложения, поэтому холодный старт не порождает волну
+    запросов к внешнему API. Оба уровня ограничены по числу записей.
+
+    SQLite работает в отдельном потоке, и event loop ее не ждет: чтение
+    с диска - через await, запись ставится в очередь этого потока.
+    accessed_at (для вытеснения с диска) копится в памяти и пишется пачкой
+    вместе со следующей записью или по TOUCH_BATCH обращений.
+    """
+
+    TOUCH_BATCH = 256
+
+    def __init__(
+            self,
+            path: str,
+            ttl: float,
+            stale_while_revalidate: bool = True,
+            max_stale: Optional[float] = None,
+            memory_size: int = 1024,
+            disk_size: int = 100_000
+    ):
+        super().__init__(ttl, stale_while_revalidate=stale_while_revalidate, max_stale=max_stale)
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory: "OrderedDict[str, Entry]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # ключ -> время последнего обращения, еще не записанное на диск
+        self._touched: Dict[str, float] = {}
+        self._disk_entries = 0
+        self.disk_errors = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    def open(self) -> None:
+        """Открывает (и при необходимости создает) файл кэша в потоке кэша"""
+        # Один поток: соединение SQLite используется только из него, записи идут по порядку
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persistent-cache")
+        self._executor.submit(self._disk_open).result()
+
+    def close(self) -> None:
+        """Дописывает очередь записей и закрывает файл"""
+        if self._executor is None:
+            return
+        if self._touched:
+            self._submit(self._disk_touch, self._take_touched())
+        self._executor.submit(self._disk_close).result()
+        self._executor.shutdown()
+        self._executor = None
+
+    def _lookup(self, key: str) -> Optional[Entry]:
+        """Только уровень в памяти - для peek() и prefetch()"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self._touch(key)
+        return entry
+
+    async def _fetch(self, key: str) -> Optional[Entry]:
+        entry = self._lookup(key)
+        if entry is not None:
+            self.memory_hits += 1
+            return entry
+        if self._executor is None:
+            return None
+
+        entry = await asyncio.get_running_loop().run_in_executor(self._executor, self._disk_get, key)
+        if entry is None:
+            return None
+        # Пока шло чтение, загрузчик мог положить в память более свежее значение
+        current = self._memory.get(key)
+        if current is not None:
+            return current
+        self.disk_hits += 1
+        self._touch(key)
+        self._remember(key, entry)
+        return entry
+
+    def _store(self, key: str, value: Any) -> None:
+        now = time.time()
+        self._remember(key, (value, now))
+        self._touched.pop(key, None)
+        if self._executor is not None:
+            self._submit(self._disk_put, key, value, now, self._take_touched())
+
+    def _touch(self, key: str) -> None:
+        self._touched[key] = time.time()
+        if len(self._touched) >= self.TOUCH_BATCH and self._executor is not None:
+            self._submit(self._disk_touch, self._take_touched())
+
+    def _take_touched(self) -> Dict[str, float]:
+        touched, self._touched = self._touched, {}
+        return touched
+
+    def _submit(self, job: Callable, *args) -> None:
+        """Запись в потоке кэша без ожидания; ошибка диска не должна ронять запрос"""
+        future = self._executor.submit(job, *args)
+        future.add_done_callback(self._count_error)
+
+    def _count_error(self, future) -> None:
+        if future.exception() is not None:
+            self.disk_errors += 1
+
+    # Методы _disk_* выполняются только в потоке кэша
+
+    def _disk_open(self) -> None:
+        self._conn = sqlite3.connect(self.path)
+        # WAL + synchronous=NORMAL: запись не ждет fsync, чтение не блокируется записью
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+        self._conn.commit()
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _disk_close(self) -> None:
+        self._conn.close()
+        self._conn = None
+
+    def _disk_get(self, key: str) -> Optional[Entry]:
+        row = self._conn.execute("SELECT value, stored_at FROM cache WHERE key = ?", (key,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row is not None else None
+
+    def _disk_touch(self, touched: Dict[str, float]) -> None:
+        self._write_touched(touched)
+        self._conn.commit()
+
+    def _write_touched(self, touched: Dict[str, float]) -> None:
+        self._conn.executemany(
+            "UPDATE cache SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in touched.items()]
+        )
+
+    def _disk_put(self, key: str, value: Any, now: float, touched: Dict[str, float]) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, payload, now, now)
+        )
+        if cursor.rowcount:
+            self._disk_entries += 1
+        else:
+            self._conn.execute(
+                "UPDATE cache SET value = ?, stored_at = ?, accessed_at = ? WHERE key = ?",
+                (payload, now, now, key)
+            )
+        # Обращения пишутся до вытеснения, чтобы оно учитывало свежие accessed_at
+        self._write_touched(touched)
+        overflow = self._disk_entries - self.disk_size
+        if overflow > 0:
+            # Вытесняем записи, к которым дольше всего не обращались
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            )
+            self._disk_entries -= overflow
+            self.disk_evictions += overflow
+        self._conn.commit()
+
+    def _disk_delete(self, key: str) -> None:
+        cursor = self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._conn.commit()
+        self._disk_entries -= cursor.rowcount
+
+    def _remember(self, key: str, entry: Entry) -> None:
+        """Кладет запись в LRU-уровень в памяти"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        self._memory.pop(key, None)
+        self._touched.pop(key, None)
+        if self._executor is not None:
+            self._submit(self._disk_delete, key)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({
+            "entries": len(self._memory),
+            "disk_entries": self._disk_entries,
+            "memory_size": self.memory_size,
+            "disk_size": self.disk_size,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "memory_evictions": self.memory_evictions,
+            "disk_evictions": self.disk_evictions,
+            "disk_errors": self.disk_errors,
+        })
+        return stats
@@ -0,0 +1,103 @@
+"""
+Локальная заглушка Google Books и Chuck Norris API для бенчмарков.
+Отвечает с искусственной задержкой и считает одновременно обрабатываемые запросы.
+Может имитировать медленные ответы (хвост задержек) и отказы.
+"""
+import asyncio
+import itertools
+import random
+import socket
+
+from aiohttp import web
+
+CATEGORIES = ["animal", "career", "celebrity", "dev", "food", "movie", "science", "sport"]
+
+
+class FakeUpstream:
+    """
+    Заглушка внешних API с настраиваемой задержкой.
+
+    slow_fraction - доля запросов, отвечающих с задержкой slow_latency;
+    fail_rate     - доля запросов, завершающихся ответом 503.
+    """
+
+    def __init__(self, latency: float = 0.2, slow_fraction: float = 0.0, slow_latency: float = 2.0,
+                 fail_rate: float = 0.0):
+        self.latency = latency
+        self.slow_fraction = slow_fraction
+        self.slow_latency = slow_latency
+        self.fail_rate = fail_rate
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests_total = 0
+        self._joke_ids = itertools.count(1)
+        self._runner = None
+        self.port = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def reset_stats(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests_total = 0
+
+    async def _delay(self):
+        self.requests_total += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            slow = random.random() < self.slow_fraction
+            await asyncio.sleep(self.slow_latency if slow else self.latency)
+        finally:
+            self.in_flight -= 1
+        if random.random() < self.fail_rate:
+            raise web.HTTPServiceUnavailable()
+
+    async def volumes(self, request: web.Request) -> web.Response:
+        await self._delay()
+        query = request.query.get("q", "")
+        items = [
+            {"volumeInfo": {"title": f"{query} #{i}", "authors": ["Fake Author"], "pageCount": 100 + i}}
+            for i in range(int(request.query.get("maxResults", 5)))
+        ]
+        return web.json_response({"items": items})
+
+    async def random_joke(self, request: web.Request) -> web.Response:
+        await self._delay()
+        category = request.query.get("category")
+        joke_id = next(self._joke_ids)
+        return web.json_response({
+            "id": f"fake-{joke_id}",
+            "value": f"Chuck Norris joke #{joke_id}",
+            "categories": [category] if category else [],
+            "url": f"{self.base_url}/jokes/fake-{joke_id}"
+        })
+
+    async def categories(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response(CATEGORIES)
+
+    async def start(self, port: int = 0) -> None:
+        app = web.Application()
+        app.router.add_get("/books/v1/volumes", self.volumes)
+        app.router.add_get("/jokes/random", self.random_joke)
+        app.router.add_get("/jokes/categories", self.categories)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port or self.port or 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def free_port() -> int:
+    """Свободный локальный порт (нужен до импорта приложения, чтобы задать URL заглушки)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
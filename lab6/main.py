@@ -1,18 +1,100 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
+from markupsafe import Markup
 from pydantic import BaseModel
-import requests
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
+
+from cache import PersistentCache, TTLCache
+from rendering import FragmentCache, stream_template, warm_templates
+from static_assets import StaticAssets
+from upstream import UpstreamClient, UpstreamError, GOOGLE_BOOKS_API_URL, CHUCK_NORRIS_API_URL
+
+# Общий клиент с пулом соединений для всех обращений к внешним API
+upstream = UpstreamClient()
+
+# Список категорий шуток меняется крайне редко - держим его в кэше
+CATEGORIES_TTL = float(os.getenv("CATEGORIES_TTL", "3600"))
+CATEGORIES_STALE_WHILE_REVALIDATE = os.getenv("CATEGORIES_STALE_WHILE_REVALIDATE", "1") == "1"
+categories_cache = TTLCache(ttl=CATEGORIES_TTL, stale_while_revalidate=CATEGORIES_STALE_WHILE_REVALIDATE)
+
+# Кэш результатов поиска книг: LRU в памяти + SQLite-файл, переживающий перезапуск
+BOOKS_CACHE_PATH = os.getenv("BOOKS_CACHE_PATH", "books_cache.db")
+BOOKS_CACHE_TTL = float(os.getenv("BOOKS_CACHE_TTL", "3600"))
+BOOKS_CACHE_MAX_STALE = float(os.getenv("BOOKS_CACHE_MAX_STALE", "86400"))
+BOOKS_CACHE_MEMORY_SIZE = int(os.getenv("BOOKS_CACHE_MEMORY_SIZE", "1024"))
+BOOKS_CACHE_DISK_SIZE = int(os.getenv("BOOKS_CACHE_DISK_SIZE", "100000"))
+books_cache = PersistentCache(
+    BOOKS_CACHE_PATH,
+    ttl=BOOKS_CACHE_TTL,
+    stale_while_revalidate=True,
+    max_stale=BOOKS_CACHE_MAX_STALE,
+    memory_size=BOOKS_CACHE_MEMORY_SIZE,
+    disk_size=BOOKS_CACHE_DISK_SIZE
+)
+
+# Сколько запросов к Chuck Norris API выполняет одновременно пакетный эндпоинт
+JOKES_BATCH_CONCURRENCY = int(os.getenv("JOKES_BATCH_CONCURRENCY", "8"))
+
+
+def load_categories():
+    """Запрос списка категорий к Chuck Norris API (загрузчик для кэша)"""
+    return upstream.get_json(f"{CHUCK_NORRIS_API_URL}/jokes/categories")
+
+
+async def fetch_categories() -> List[str]:
+    """Список категорий шуток Chuck Norris API (через кэш)"""
+    return await categories_cache.get("categories", load_categories)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Открываем пул соединений и файл кэша при старте, закрываем при остановке"""
+    await upstream.start()
+    books_cache.open()
+    assets.load()
+    warm_templates(templates.env)
+    # Список категорий загружаем в фоне, чтобы главная страница его не ждала
+    categories_cache.prefetch("categories", load_categories)
+    yield
+    books_cache.close()
+    await upstream.close()
+
+
+app = FastAPI(
+    title="Lab 6: Work with API",
+    description="Interaction with Google Books and Chuck Norris Jokes API",
+    lifespan=lifespan
+)
 
-app = FastAPI(title="Lab 6: Work with API", description="Interaction with Google Books and Chuck Norris Jokes API")
+# Статические файлы: индекс в памяти со сжатыми вариантами и хэшами содержимого
+assets = StaticAssets(directory="static", prefix="/static")
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_file(path: str, request: Request):
+    """Отдает статический файл из индекса в памяти"""
+    return assets.response(path, request)
 
-# Монтируем статические файлы
-app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Настройка Jinja2 для работы с HTML-шаблонами
 templates = Jinja2Templates(directory="templates")
+# static_url('style.css') -> /static/style.<хэш>.css
+templates.env.globals["static_url"] = assets.url
+
+# Кэш отрендеренных фрагментов страницы (выпадающий список категорий, блок с книгами)
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "512"))
+fragments = FragmentCache(templates.env, max_size=FRAGMENT_CACHE_SIZE)
+
+
+def category_select(categories: List[str], selected_category: Optional[str] = None) -> Markup:
+    """Выпадающий список категорий шуток (из кэша фрагментов)"""
+    return fragments.render("_category_select.html", categories=categories, selected_category=selected_category)
 
 
 # ========== ЗАДАНИЕ 1: Google Books API ==========
@@ -27,46 +109,59 @@ class BookItem(BaseModel):
     categories: Optional[List[str]] = None
 
 
+def normalize_query(q: str) -> str:
+    """Ключ кэша поиска: без лишних пробелов и без учета регистра"""
+    return " ".join(q.split()).casefold()
+
+
+async def fetch_books(query: str) -> List[dict]:
+    """Запрос к Google Books API; результат - список книг в виде словарей (для кэша)"""
+    params = {
+        "q": query,
+        "maxResults": 5,  # Получаем 5 результатов
+        "printType": "books"
+    }
+    data = await upstream.get_json(f"{GOOGLE_BOOKS_API_URL}/volumes", params=params)
+
+    books = []
+    for item in data.get("items", []):
+        volume_info = item.get("volumeInfo", {})
+        book = BookItem(
+            title=volume_info.get("title", "No title"),
+            authors=volume_info.get("authors", ["Unknown author"]),
+            published_date=volume_info.get("publishedDate", ""),
+            description=volume_info.get("description", "No description"),
+            page_count=volume_info.get("pageCount"),
+            categories=volume_info.get("categories", [])
+        )
+        books.append(book.model_dump())
+    return books
+
+
 @app.get("/books/search", response_class=HTMLResponse)
 async def search_books(request: Request, q: str = "Python programming"):
     """
     Поиск книг через Google Books API.
     По умолчанию ищет книги по запросу 'Python programming'.
+    Результаты кэшируются по нормализованному запросу (в памяти и на диске).
     """
-    api_url = "https://www.googleapis.com/books/v1/volumes"
-    params = {
-        "q": q,
-        "maxResults": 5,  # Получаем 5 результатов
-        "printType": "books"
-    }
+    query = normalize_query(q)
 
     try:
-        response = requests.get(api_url, params=params)
-        response.raise_for_status()  # Проверка на ошибки HTTP
-        data = response.json()
-
-        books = []
-        for item in data.get("items", []):
-            volume_info = item.get("volumeInfo", {})
-            book = BookItem(
-                title=volume_info.get("title", "No title"),
-                authors=volume_info.get("authors", ["Unknown author"]),
-                published_date=volume_info.get("publishedDate", ""),
-                description=volume_info.get("description", "No description"),
-                page_count=volume_info.get("pageCount"),
-                categories=volume_info.get("categories", [])
-            )
-            books.append(book)
+        books = await books_cache.get(query, lambda: fetch_books(query))
 
-        # Возвращаем HTML-страницу с результатами
-        return templates.TemplateResponse("index.html", {
-            "request": request,
+        # Возвращаем HTML-страницу с результатами (потоковый рендеринг):
+        # блок книг подключен через include и уходит клиенту по мере рендеринга,
+        # поэтому время до первого байта не зависит от числа результатов
+        context = {
             "books": books,
             "query": q,
-            "show_books": True
-        })
+            "show_books": True,
+            "category_select_html": category_select(categories_cache.peek("categories") or [])
+        }
+        return StreamingResponse(stream_template(templates.env, "index.html", context), media_type="text/html")
 
-    except requests.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching data from Google Books API: {str(e)}")
 
 
@@ -85,27 +180,30 @@ async def get_random_joke(request: Request, category: str = None):
     Получение случайной шутки о Чаке Норрисе.
     Можно указать категорию для фильтрации.
     """
-    api_url = "https://api.chucknorris.io/jokes/random"
+    api_url = f"{CHUCK_NORRIS_API_URL}/jokes/random"
+    params = {"category": category} if category else None
 
     try:
-        if category:
-            # Если указана категория, получаем шутку из конкретной категории
-            categories_url = "https://api.chucknorris.io/jokes/categories"
-            categories_response = requests.get(categories_url)
-            categories_response.raise_for_status()
-            available_categories = categories_response.json()
+        # Список категорий (для проверки и для формы) и шутку запрашиваем параллельно
+        categories, joke_data = await asyncio.gather(
+            fetch_categories(),
+            upstream.get_json(api_url, params=params),
+            return_exceptions=True
+        )
 
-            if category not in available_categories:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid category. Available categories: {', '.join(available_categories)}"
-                )
+        if isinstance(categories, BaseException):
+            if category or not isinstance(categories, UpstreamError):
+                raise categories
+            categories = []  # без категории список нужен только для формы
 
-            api_url = f"https://api.chucknorris.io/jokes/random?category={category}"
+        if category and category not in categories:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid category. Available categories: {', '.join(categories)}"
+            )
 
-        response = requests.get(api_url)
-        response.raise_for_status()
-        joke_data = response.json()
+        if isinstance(joke_data, BaseException):
+            raise joke_data
 
         joke = JokeResponse(
             joke=joke_data.get("value", "No joke found"),
@@ -114,22 +212,14 @@ async def get_random_joke(request: Request, category: str = None):
             id=joke_data.get("id")
         )
 
-        # Получаем список категорий для формы
-        categories_response = requests.get("https://api.chucknorris.io/jokes/categories")
-        categories = categories_response.json() if categories_response.status_code == 200 else []
-
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "joke": joke,
-                "selected_category": category,
-                "categories": categories,
-                "show_joke": True
-            }
-        )
+        return HTMLResponse(templates.get_template("index.html").render(
+            joke=joke,
+            selected_category=category,
+            category_select_html=category_select(categories, category),
+            show_joke=True
+        ))
 
-    except requests.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching joke from API: {str(e)}")
 
 
@@ -139,62 +229,134 @@ async def get_joke_categories():
     Получение списка всех доступных категорий шуток.
     """
     try:
-        response = requests.get("https://api.chucknorris.io/jokes/categories")
-        response.raise_for_status()
-        categories = response.json()
+        categories = await fetch_categories()
 
         return {
             "categories": categories,
             "total_categories": len(categories)
         }
 
-    except requests.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching categories from API: {str(e)}")
 
 
+def joke_to_dict(joke_data: dict) -> dict:
+    """JSON-представление шутки из ответа Chuck Norris API"""
+    return {
+        "id": joke_data.get("id"),
+        "joke": joke_data.get("value"),
+        "categories": joke_data.get("categories", []),
+        "url": joke_data.get("url"),
+        "icon_url": joke_data.get("icon_url"),
+        "created_at": joke_data.get("created_at"),
+        "updated_at": joke_data.get("updated_at")
+    }
+
+
 @app.get("/jokes/random/json")
 async def get_random_joke_json(category: str = None):
     """
     Получение случайной шутки в формате JSON.
     """
     try:
-        api_url = "https://api.chucknorris.io/jokes/random"
-
-        if category:
-            api_url = f"https://api.chucknorris.io/jokes/random?category={category}"
+        api_url = f"{CHUCK_NORRIS_API_URL}/jokes/random"
+        params = {"category": category} if category else None
 
-        response = requests.get(api_url)
-        response.raise_for_status()
-        joke_data = response.json()
+        joke_data = await upstream.get_json(api_url, params=params)
 
-        return {
-            "id": joke_data.get("id"),
-            "joke": joke_data.get("value"),
-            "categories": joke_data.get("categories", []),
-            "url": joke_data.get("url"),
-            "icon_url": joke_data.get("icon_url"),
-            "created_at": joke_data.get("created_at"),
-            "updated_at": joke_data.get("updated_at")
-        }
+        return joke_to_dict(joke_data)
 
-    except requests.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching joke from API: {str(e)}")
 
 
+async def stream_unique_jokes(n: int, category: Optional[str]) -> AsyncIterator[str]:
+    """
+    Получает n разных шуток, выполняя не более JOKES_BATCH_CONCURRENCY запросов одновременно.
+    Шутки отдаются построчно (NDJSON) по мере получения; повторы по id отбрасываются
+    и запрашиваются заново, но всего не более 2 * n запросов.
+    """
+    api_url = f"{CHUCK_NORRIS_API_URL}/jokes/random"
+    params = {"category": category} if category else None
+    seen = set()
+    attempts = 0
+    in_flight = 0
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        nonlocal attempts, in_flight
+        # Новый запрос отправляем, только если уже запущенных может не хватить до n
+        while len(seen) + in_flight < n and attempts < 2 * n:
+            attempts += 1
+            in_flight += 1
+            try:
+                joke_data = await upstream.get_json(api_url, params=params)
+            except UpstreamError as e:
+                await queue.put({"error": f"Error fetching joke from API: {str(e)}"})
+                return
+            finally:
+                in_flight -= 1
+            joke_id = joke_data.get("id")
+            if joke_id in seen or len(seen) >= n:
+                continue
+            seen.add(joke_id)
+            await queue.put(joke_to_dict(joke_data))
+
+    workers = asyncio.gather(*(worker() for _ in range(min(JOKES_BATCH_CONCURRENCY, n))))
+    workers.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (item := await queue.get()) is not None:
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+    finally:
+        workers.cancel()
+
+
+@app.get("/jokes/random/batch")
+async def get_random_jokes_batch(
+        n: int = Query(10, ge=1, le=100, description="Количество шуток"),
+        category: Optional[str] = None
+):
+    """
+    Пакетное получение случайных шуток без повторов.
+    Ответ - поток NDJSON: одна шутка на строку по мере получения.
+    """
+    if category:
+        try:
+            available_categories = await fetch_categories()
+        except UpstreamError as e:
+            raise HTTPException(status_code=500, detail=f"Error fetching categories from API: {str(e)}")
+        if category not in available_categories:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid category. Available categories: {', '.join(available_categories)}"
+            )
+
+    return StreamingResponse(stream_unique_jokes(n, category), media_type="application/x-ndjson")
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     """Главная страница с ссылками на оба задания."""
-    # Получаем список категорий для отображения на главной странице
-    try:
-        categories_response = requests.get("https://api.chucknorris.io/jokes/categories")
-        categories = categories_response.json() if categories_response.status_code == 200 else []
-    except:
-        categories = []
-
-    return templates.TemplateResponse("index.html", {
-        "request": request,
-        "categories": categories
-    })
+    # Список категорий берем из кэша, не дожидаясь внешнего API; если его
+    # еще нет или он устарел, загрузка уйдет в фон и свежий список появится
+    # при следующем запросе
+    categories = categories_cache.peek("categories")
+    categories_cache.prefetch("categories", load_categories)
+
+    return HTMLResponse(templates.get_template("index.html").render(
+        category_select_html=category_select(categories or [])
+    ))
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Счетчики кэшей и обращений к внешним API."""
+    return {
+        "categories_cache": categories_cache.stats(),
+        "books_cache": books_cache.stats(),
+        "upstream": upstream.stats(),
+        "fragment_cache": fragments.stats()
+    }
 
 
 if __name__ == "__main__":
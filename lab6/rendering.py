@@ -0,0 +1,74 @@
+import json
+from collections import OrderedDict
+from typing import Iterable, Iterator
+
+from jinja2 import Environment
+from markupsafe import Markup
+
+# Шаблоны, которые компилируются при старте приложения
+TEMPLATE_NAMES = ("index.html", "_category_select.html", "_books.html")
+
+
+def warm_templates(env: Environment, names: Iterable[str] = TEMPLATE_NAMES) -> None:
+    """
+    Компилирует шаблоны заранее, чтобы первый запрос не платил за разбор.
+    auto_reload=False отключает проверку mtime файла при каждом get_template.
+    """
+    env.auto_reload = False
+    for name in names:
+        env.get_template(name)
+
+
+class FragmentCache:
+    """
+    LRU-кэш отрендеренных фрагментов шаблонов.
+    Ключ - имя шаблона и входные данные, поэтому при тех же данных
+    фрагмент не рендерится повторно.
+    """
+
+    def __init__(self, env: Environment, max_size: int = 512):
+        self.env = env
+        self.max_size = max_size
+        self._fragments: "OrderedDict[tuple, Markup]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, name: str, **context) -> Markup:
+        key = (name, json.dumps(context, sort_keys=True, ensure_ascii=False, default=str))
+        fragment = self._fragments.get(key)
+        if fragment is not None:
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+        self.misses += 1
+        fragment = Markup(self.env.get_template(name).render(**context))
+        self._fragments[key] = fragment
+        if len(self._fragments) > self.max_size:
+            self._fragments.popitem(last=False)
+        return fragment
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._fragments),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def stream_template(env: Environment, name: str, context: dict, chunk_size: int = 8192) -> Iterator[str]:
+    """
+    Потоковый рендеринг: первые байты страницы уходят клиенту до того,
+    как отрендерен весь шаблон. Мелкие куски вывода Jinja2 склеиваются
+    в блоки примерно по chunk_size символов.
+    """
+    buffer, size = [], 0
+    for piece in env.get_template(name).generate(**context):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
@@ -0,0 +1,261 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+# Базовые адреса внешних API (переопределяются, например, для локальной заглушки)
+GOOGLE_BOOKS_API_URL = os.getenv("GOOGLE_BOOKS_API_URL", "https://www.googleapis.com/books/v1")
+CHUCK_NORRIS_API_URL = os.getenv("CHUCK_NORRIS_API_URL", "https://api.chucknorris.io")
+
+# Параметры пула соединений
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "100"))
+UPSTREAM_LIMIT_PER_HOST = int(os.getenv("UPSTREAM_LIMIT_PER_HOST", "20"))
+UPSTREAM_KEEPALIVE_TIMEOUT = float(os.getenv("UPSTREAM_KEEPALIVE_TIMEOUT", "30"))
+
+# Таймауты: установка соединения и ожидание данных от сервера
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "10"))
+
+# Circuit breaker: сколько ошибок подряд открывают цепь и через сколько секунд пробуем снова
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+# Hedged requests: повторный запрос, если первый не ответил за p95 задержки хоста
+UPSTREAM_HEDGE = os.getenv("UPSTREAM_HEDGE", "0") == "1"
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.01
+
+
+class UpstreamError(Exception):
+    """Ошибка при обращении к внешнему API."""
+
+
+class CircuitOpenError(UpstreamError):
+    """Внешний API признан недоступным, запрос не отправлялся."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для одного хоста.
+
+    closed    - запросы идут как обычно, ошибки подряд подсчитываются;
+    open      - после failure_threshold ошибок подряд запросы сразу отклоняются;
+    half_open - через reset_timeout пропускается один пробный запрос,
+                его успех закрывает цепь, ошибка снова открывает.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос сейчас"""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def release_probe(self) -> None:
+        """Пробный запрос не завершился (например, был отменен) - разрешаем новый"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class HostStats:
+    """Задержки успешных запросов к хосту (скользящее окно) и счетчики hedged-запросов"""
+
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._p95: Optional[float] = None
+
+    def record_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self._p95 = None
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        if self._p95 is None:
+            ordered = sorted(self.latencies)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+        return self._p95
+
+    def stats(self) -> dict:
+        p95 = self.p95()
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedges, 4) if self.hedges else 0.0,
+        }
+
+
+class UpstreamClient:
+    """
+    Общий асинхронный HTTP-клиент для внешних API.
+    Держит пул keep-alive соединений, который открывается и закрывается в lifespan приложения.
+    Каждый запрос ограничен таймаутами и проходит через circuit breaker своего хоста.
+    """
+
+    def __init__(
+            self,
+            pool_size: int = UPSTREAM_POOL_SIZE,
+            limit_per_host: int = UPSTREAM_LIMIT_PER_HOST,
+            keepalive_timeout: float = UPSTREAM_KEEPALIVE_TIMEOUT,
+            connect_timeout: float = UPSTREAM_CONNECT_TIMEOUT,
+            read_timeout: float = UPSTREAM_READ_TIMEOUT,
+            hedge: bool = UPSTREAM_HEDGE
+    ):
+        self.pool_size = pool_size
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=read_timeout)
+        self.hedge = hedge
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.host_stats: Dict[str, HostStats] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Создает сессию с пулом соединений"""
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self) -> None:
+        """Закрывает сессию и все соединения пула"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            raise RuntimeError("UpstreamClient не запущен: вызовите start() в lifespan приложения")
+        return self._session
+
+    async def get_json(self, url: str, params: Optional[dict] = None) -> Any:
+        """GET-запрос к внешнему API с разбором JSON-ответа"""
+        host = urlsplit(url).netloc
+        breaker = self.breakers.setdefault(host, CircuitBreaker())
+        stats = self.host_stats.setdefault(host, HostStats())
+
+        if not breaker.allow():
+            raise CircuitOpenError(f"{host} is unavailable (circuit open)")
+
+        stats.requests += 1
+        try:
+            if self.hedge and stats.p95() is not None:
+                result = await self._hedged(url, params, stats)
+            else:
+                result = await self._attempt(url, params, stats)
+        except aiohttp.ClientResponseError as e:
+            if e.status < 500:
+                # Ответ 4xx означает, что сервер жив - это не повод открывать цепь
+                breaker.record_success()
+            else:
+                stats.failures += 1
+                breaker.record_failure()
+            raise UpstreamError(str(e)) from e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            stats.failures += 1
+            breaker.record_failure()
+            raise UpstreamError(str(e) or type(e).__name__) from e
+        except BaseException:
+            # Отмена запроса вызывающей стороной ничего не говорит о здоровье хоста
+            breaker.release_probe()
+            raise
+
+        breaker.record_success()
+        return result
+
+    async def _attempt(self, url: str, params: Optional[dict], stats: HostStats) -> Any:
+        started = time.perf_counter()
+        async with self.session.get(url, params=params) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        stats.record_latency(time.perf_counter() - started)
+        return data
+
+    async def _hedged(self, url: str, params: Optional[dict], stats: HostStats) -> Any:
+        """Если первый запрос не ответил за p95, отправляет второй; побеждает первый успешный"""
+        primary = asyncio.ensure_future(self._attempt(url, params, stats))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=max(stats.p95(), HEDGE_MIN_DELAY))
+            if done:
+                return primary.result()
+
+            stats.hedges += 1
+            hedge = asyncio.ensure_future(self._attempt(url, params, stats))
+            tasks.append(hedge)
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            stats.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Проигравший запрос (или оба, если отменили вызывающего) отменяем
+            # и дожидаемся, чтобы он вернул соединение в пул
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Состояние circuit breaker и задержки по каждому хосту"""
+        return {
+            host: {**self.host_stats[host].stats(), "breaker": breaker.stats()}
+            for host, breaker in self.breakers.items()
+        }